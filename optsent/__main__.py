@@ -17,8 +17,45 @@ class CLI(Object):
         self._parser.add_argument("-c", "--constraint", default="none")
         self._parser.add_argument("-f", "--cutoff", type=float, default=0.0)
         self._parser.add_argument("-l", "--seqlen", type=int, default=-1)
+        self._parser.add_argument("-k", "--nlists", type=int, default=1)
         self._parser.add_argument("-x", "--maximize", action="store_true")
+        self._parser.add_argument("-r", "--restarts", type=int, default=1)
+        self._parser.add_argument("-w", "--beamwidth", type=int, default=8)
+        self._parser.add_argument("--seed", type=int, default=None)
+        self._parser.add_argument("--chains", type=int, default=1)
+        self._parser.add_argument("--maxexact", type=int, default=16)
+        self._parser.add_argument("--cooling", type=float, default=0.9995)
+        self._parser.add_argument("--timebudget", type=float, default=60.0)
+        self._parser.add_argument("--maxiter", type=int, default=-1)
         self._parser.add_argument("-n", "--ncores", type=int, default=-1)
+        self._parser.add_argument("-b", "--batchsize", type=int, default=16)
+        self._parser.add_argument("--blocksize", type=int, default=-1)
+        self._parser.add_argument(
+            "--backend", choices=["thread", "process"], default="thread"
+        )
+        self._parser.add_argument("--cache", action="store_true")
+        self._parser.add_argument("--cachedir", default=None)
+        self._parser.add_argument("--cachesize", type=int, default=65536)
+        self._parser.add_argument("--separator", default=None)
+        self._parser.add_argument(
+            "--precision", choices=["fp32", "bf16", "int8"], default="fp32"
+        )
+        self._parser.add_argument(
+            "--reuse-graph", dest="reuse_graph", action="store_true", default=True
+        )
+        self._parser.add_argument(
+            "--force-rebuild", dest="reuse_graph", action="store_false"
+        )
+        self._parser.add_argument(
+            "--graphfmt", choices=["auto", "npy", "csv"], default="auto"
+        )
+        self._parser.add_argument("--basegraph", default=None)
+        self._parser.add_argument(
+            "--dtype", choices=["float64", "float32"], default="float64"
+        )
+        self._parser.add_argument("--topk", type=int, default=-1)
+        self._parser.add_argument("--prune", type=int, default=-1)
+        self._parser.add_argument("--lazy", action="store_true")
 
     def run_main(self) -> None:
         start = datetime.datetime.now()
@@ -35,12 +35,10 @@ class Object(abc.ABC):
 
 @typing.runtime_checkable
 class IModel(typing.Protocol):
-    @staticmethod
-    def score(sent: str) -> float:
+    def score(self, sent: str) -> float:
         raise NotImplementedError()  # pragma: no cover
 
-    @staticmethod
-    def embed(sent: str) -> npt.NDArray[np.float32]:
+    def embed(self, sent: str) -> npt.NDArray[np.float32]:
         raise NotImplementedError()  # pragma: no cover
 
 
@@ -7,13 +7,29 @@ import numpy as np
 import pandas as pd
 
 from optsent.abstract import Object, IModel, IObjective, IOptimizer
-from optsent.data import SentenceCollection
+from optsent.builder import GraphBuilder
+from optsent.data import Graph, SentenceCollection, SparseGraph
 from optsent.models import Model
 from optsent.objectives import Objective
 from optsent.optimizers import Optimizer
 
 
 class ArgTool(Object):
+    _solve_defaults = {
+        "seqlen": -1,
+        "nlists": 1,
+        "restarts": 1,
+        "beamwidth": 8,
+        "seed": None,
+        "chains": 1,
+        "maxexact": 16,
+        "cooling": 0.9995,
+        "timebudget": 60.0,
+        "maxiter": -1,
+        "dtype": "float64",
+        "lazy": False,
+    }
+
     def _log_arg(self, name: str, value: typing.Any) -> None:
         indent = " " * (12 - len(name))
         self.info(f"{name}{indent}{value}")
@@ -22,28 +38,62 @@ class ArgTool(Object):
         for name, value in kwargs.items():
             self._log_arg(name, value)
 
-    def get_unique_id(self, kwargs: typing.Dict[str, typing.Any]) -> str:
-        def md5(obj):
-            return hashlib.md5(str(obj).encode()).hexdigest()
-
-        elements = ["max" if kwargs["maximize"] else "min"]
-        inputs = kwargs["inputs"]
-        if isinstance(inputs, (str, pathlib.Path)):
-            elem = str(inputs).rsplit("/", maxsplit=1)[-1].split(".")[0]
-        else:
-            elem = f"CUSTOM{md5(inputs)}"
-        elements.append(elem)
-        for key in ["objective", "optimizer", "constraint", "cutoff", "model"]:
-            value = kwargs[key]
-            if isinstance(value, (str, int, float)):
-                elem = str(value)
-            else:
-                elem = f"CUSTOM{md5(value)}"
-            elements.append(f"{key}={elem}")
+    @staticmethod
+    def _md5(obj: typing.Any) -> str:
+        return hashlib.md5(str(obj).encode()).hexdigest()
+
+    def _describe(self, value: typing.Any) -> str:
+        if isinstance(value, (str, int, float)):
+            return str(value)
+        return f"CUSTOM{self._md5(value)}"
+
+    def get_unique_id(
+        self, graph_id: str, kwargs: typing.Dict[str, typing.Any]
+    ) -> str:
+        elements = ["max" if kwargs["maximize"] else "min", graph_id]
+        for key in ["optimizer", "constraint", "cutoff"]:
+            elements.append(f"{key}={self._describe(kwargs[key])}")
+        for key, default in self._solve_defaults.items():
+            if kwargs[key] != default:
+                elements.append(f"{key}={kwargs[key]}")
         unique_id = "_".join(elements)
         self._log_arg("unique_id", unique_id)
         return unique_id
 
+    def get_graph_id(
+        self, coll: SentenceCollection, kwargs: typing.Dict[str, typing.Any]
+    ) -> str:
+        meta = self.get_graph_meta(kwargs)
+        elements = [self._md5(coll.sentences.tolist())]
+        for key in ["objective", "model"]:
+            elements.append(f"{key}={meta[key]}")
+        if meta["separator"] is not None:
+            elements.append(f"separator={meta['separator']}")
+        if meta["precision"] != "fp32":
+            elements.append(f"precision={meta['precision']}")
+        for key in ["topk", "prune"]:
+            if meta[key] > 0:
+                elements.append(f"{key}={meta[key]}")
+        if meta["maximize"] is not None:
+            elements.append("max" if meta["maximize"] else "min")
+        graph_id = "_".join(elements)
+        self._log_arg("graph_id", graph_id)
+        return graph_id
+
+    def get_graph_meta(
+        self, kwargs: typing.Dict[str, typing.Any]
+    ) -> typing.Dict[str, typing.Any]:
+        meta: typing.Dict[str, typing.Any] = {
+            key: self._describe(kwargs[key]) for key in ["objective", "model"]
+        }
+        separator = kwargs["separator"]
+        meta["separator"] = None if separator is None else self._md5(separator)
+        meta["precision"] = kwargs["precision"]
+        meta["topk"], meta["prune"] = kwargs["topk"], kwargs["prune"]
+        sparse = kwargs["topk"] > 0 or kwargs["prune"] > 0
+        meta["maximize"] = bool(kwargs["maximize"]) if sparse else None
+        return meta
+
     @staticmethod
     def prep_model(model: str | IModel) -> Model | IModel:
         if isinstance(model, str):
@@ -54,6 +104,32 @@ class ArgTool(Object):
             raise TypeError("custom model must implement `optsent.abstract.IModel`.")
         return model
 
+    def build_model(self, kwargs: typing.Dict[str, typing.Any]) -> Model | IModel:
+        model = kwargs["model"]
+        if isinstance(model, str):
+            cachedir = self.prep_cachedir(kwargs["cachedir"])
+            if cachedir is None and self.prep_cache(kwargs["cache"]):
+                cachedir = self.prep_outdir(kwargs["outdir"]) / "cache"
+            return Model(
+                model,
+                batchsize=kwargs["batchsize"],
+                cachedir=cachedir,
+                cachesize=kwargs["cachesize"],
+                separator=kwargs["separator"],
+                precision=kwargs["precision"],
+                calibrate=kwargs["precision"] != "fp32",
+            )
+        return self.prep_model(model)
+
+    @staticmethod
+    def build_graph(
+        coll: SentenceCollection, kwargs: typing.Dict[str, typing.Any]
+    ) -> Graph:
+        if kwargs["topk"] > 0 or kwargs["prune"] > 0:
+            k = min(k for k in (kwargs["topk"], kwargs["prune"]) if k > 0)
+            return SparseGraph(coll.size, k, kwargs["maximize"], kwargs["dtype"])
+        return Graph(coll.size, kwargs["dtype"])
+
     @staticmethod
     def prep_objective(
         objective: str | IObjective,
@@ -81,6 +157,16 @@ class ArgTool(Object):
                 cutoff=kwargs["cutoff"],
                 seqlen=kwargs["seqlen"],
                 maximize=kwargs["maximize"],
+                restarts=kwargs["restarts"],
+                ncores=kwargs["ncores"],
+                beamwidth=kwargs["beamwidth"],
+                seed=kwargs["seed"],
+                chains=kwargs["chains"],
+                nlists=kwargs["nlists"],
+                maxexact=kwargs["maxexact"],
+                cooling=kwargs["cooling"],
+                timebudget=kwargs["timebudget"],
+                maxiter=kwargs["maxiter"],
             )
         if isinstance(optim, type):
             raise TypeError("optimizer must be an instance of a class, not a type.")
@@ -88,6 +174,8 @@ class ArgTool(Object):
             raise TypeError(
                 "custom optimizer must implement `optsent.abstract.IOptimizer`."
             )
+        if kwargs.get("nlists", 1) > 1:
+            raise ValueError("nlists >1 is only supported by built-in optimizers.")
         return optim
 
     @staticmethod
@@ -102,9 +190,11 @@ class ArgTool(Object):
             inputs = pd.read_csv(inputs)
         if not isinstance(inputs, typing.Collection):
             raise TypeError("must supply valid inputs path or container.")
+        metadata = None
         if isinstance(inputs, pd.DataFrame):
             if "Sentence" not in inputs.columns:
                 raise ValueError("inputs must have `Sentence` column if pd.DataFrame.")
+            metadata = inputs.drop(columns="Sentence")
             inputs = inputs["Sentence"]
         if isinstance(inputs, np.ndarray):
             if inputs.ndim > 1:
@@ -120,7 +210,7 @@ class ArgTool(Object):
             raise ValueError("inputs container must have at least 2 elements.")
         if not all(isinstance(i, str) for i in inputs):
             raise TypeError("inputs container must only contain strings.")
-        return SentenceCollection(inputs)
+        return SentenceCollection(inputs, metadata)
 
     @staticmethod
     def prep_outdir(outdir: str | pathlib.Path) -> pathlib.Path:
@@ -144,7 +234,8 @@ class ArgTool(Object):
         if not isinstance(constraint, str):
             raise TypeError("constraint only accepts type `str`.")
         supported = Optimizer.supported_constraints()
-        if constraint not in supported:
+        names = [spec.strip().partition("=")[0] for spec in constraint.split(",")]
+        if not set(names) <= supported:
             raise ValueError(f"constraint must be one of {supported}.")
         return constraint
 
@@ -162,6 +253,78 @@ class ArgTool(Object):
             raise ValueError("seqlen must be >1 or -1 for all.")
         return seqlen
 
+    @staticmethod
+    def prep_restarts(restarts: int) -> int:
+        if not isinstance(restarts, int):
+            raise TypeError("restarts only accepts type `int`.")
+        if not (restarts == -1 or restarts > 0):
+            raise ValueError("restarts must be >0 or -1 for all.")
+        return restarts
+
+    @staticmethod
+    def prep_beamwidth(beamwidth: int) -> int:
+        if not isinstance(beamwidth, int):
+            raise TypeError("beamwidth only accepts type `int`.")
+        if not beamwidth > 0:
+            raise ValueError("beamwidth must be >0.")
+        return beamwidth
+
+    @staticmethod
+    def prep_maxexact(maxexact: int) -> int:
+        if not isinstance(maxexact, int):
+            raise TypeError("maxexact only accepts type `int`.")
+        if not maxexact > 0:
+            raise ValueError("maxexact must be >0.")
+        return maxexact
+
+    @staticmethod
+    def prep_cooling(cooling: int | float) -> float:
+        if not isinstance(cooling, (int, float)):
+            raise TypeError("cooling only accepts types `int` & `float`.")
+        if not 0.0 < cooling < 1.0:
+            raise ValueError("cooling must be in range (0, 1).")
+        return float(cooling)
+
+    @staticmethod
+    def prep_timebudget(timebudget: int | float) -> float:
+        if not isinstance(timebudget, (int, float)):
+            raise TypeError("timebudget only accepts types `int` & `float`.")
+        if not timebudget > 0:
+            raise ValueError("timebudget must be >0.")
+        return float(timebudget)
+
+    @staticmethod
+    def prep_maxiter(maxiter: int) -> int:
+        if not isinstance(maxiter, int):
+            raise TypeError("maxiter only accepts type `int`.")
+        if not (maxiter == -1 or maxiter > 0):
+            raise ValueError("maxiter must be >0 or -1 for no limit.")
+        return maxiter
+
+    @staticmethod
+    def prep_seed(seed: typing.Optional[int]) -> typing.Optional[int]:
+        if not (seed is None or isinstance(seed, int)):
+            raise TypeError("seed only accepts type `int` or None.")
+        if seed is not None and seed < 0:
+            raise ValueError("seed must be >=0.")
+        return seed
+
+    @staticmethod
+    def prep_chains(chains: int) -> int:
+        if not isinstance(chains, int):
+            raise TypeError("chains only accepts type `int`.")
+        if not chains > 0:
+            raise ValueError("chains must be >0.")
+        return chains
+
+    @staticmethod
+    def prep_nlists(nlists: int) -> int:
+        if not isinstance(nlists, int):
+            raise TypeError("nlists only accepts type `int`.")
+        if not nlists > 0:
+            raise ValueError("nlists must be >0.")
+        return nlists
+
     @staticmethod
     def prep_maximize(maximize: bool) -> bool:
         if not isinstance(maximize, bool):
@@ -179,6 +342,135 @@ class ArgTool(Object):
             )
         return ncores
 
+    @staticmethod
+    def prep_batchsize(batchsize: int) -> int:
+        if not isinstance(batchsize, int):
+            raise TypeError("batchsize only accepts type `int`.")
+        if not batchsize > 0:
+            raise ValueError("batchsize must be >0.")
+        return batchsize
+
+    @staticmethod
+    def prep_separator(separator: typing.Optional[str]) -> typing.Optional[str]:
+        if not (separator is None or isinstance(separator, str)):
+            raise TypeError("separator only accepts type `str` or None.")
+        return separator
+
+    @staticmethod
+    def prep_precision(precision: str) -> str:
+        if not isinstance(precision, str):
+            raise TypeError("precision only accepts type `str`.")
+        if precision not in Model.supported_precisions():
+            raise ValueError(
+                f"precision must be one of {Model.supported_precisions()}."
+            )
+        return precision
+
+    @staticmethod
+    def prep_blocksize(blocksize: int) -> int:
+        if not isinstance(blocksize, int):
+            raise TypeError("blocksize only accepts type `int`.")
+        if not (blocksize == -1 or blocksize > 0):
+            raise ValueError("blocksize must be >0 or -1 for auto.")
+        return blocksize
+
+    @staticmethod
+    def prep_backend(backend: str) -> str:
+        if not isinstance(backend, str):
+            raise TypeError("backend only accepts type `str`.")
+        supported = GraphBuilder.supported_backends()
+        if backend not in supported:
+            raise ValueError(f"backend must be one of {supported}.")
+        return backend
+
+    @staticmethod
+    def prep_cache(cache: bool) -> bool:
+        if not isinstance(cache, bool):
+            raise TypeError("cache only accepts type `bool`.")
+        return cache
+
+    @staticmethod
+    def prep_cachedir(
+        cachedir: typing.Optional[str | pathlib.Path],
+    ) -> typing.Optional[pathlib.Path]:
+        if cachedir is None:
+            return None
+        if isinstance(cachedir, str):
+            cachedir = pathlib.Path(cachedir).resolve()
+        if not isinstance(cachedir, pathlib.Path):
+            raise TypeError("cachedir must be valid path type or None.")
+        return cachedir
+
+    @staticmethod
+    def prep_cachesize(cachesize: int) -> int:
+        if not isinstance(cachesize, int):
+            raise TypeError("cachesize only accepts type `int`.")
+        if not cachesize > 0:
+            raise ValueError("cachesize must be >0.")
+        return cachesize
+
+    @staticmethod
+    def prep_reuse_graph(reuse_graph: bool) -> bool:
+        if not isinstance(reuse_graph, bool):
+            raise TypeError("reuse_graph only accepts type `bool`.")
+        return reuse_graph
+
+    @staticmethod
+    def prep_dtype(dtype: str) -> str:
+        if not isinstance(dtype, str):
+            raise TypeError("dtype only accepts type `str`.")
+        supported = {"float64", "float32"}
+        if dtype not in supported:
+            raise ValueError(f"dtype must be one of {supported}.")
+        return dtype
+
+    @staticmethod
+    def prep_topk(topk: int) -> int:
+        if not isinstance(topk, int):
+            raise TypeError("topk only accepts type `int`.")
+        if not (topk == -1 or topk > 0):
+            raise ValueError("topk must be >0 or -1 for dense.")
+        return topk
+
+    @staticmethod
+    def prep_prune(prune: int) -> int:
+        if not isinstance(prune, int):
+            raise TypeError("prune only accepts type `int`.")
+        if not (prune == -1 or prune > 0):
+            raise ValueError("prune must be >0 or -1 for exhaustive.")
+        return prune
+
+    @staticmethod
+    def prep_graphfmt(graphfmt: str) -> str:
+        if not isinstance(graphfmt, str):
+            raise TypeError("graphfmt only accepts type `str`.")
+        supported = {"auto", "npy", "csv"}
+        if graphfmt not in supported:
+            raise ValueError(f"graphfmt must be one of {supported}.")
+        return graphfmt
+
+    @staticmethod
+    def prep_basegraph(
+        basegraph: typing.Optional[str | pathlib.Path],
+    ) -> typing.Optional[pathlib.Path]:
+        if basegraph is None:
+            return None
+        if isinstance(basegraph, str):
+            basegraph = pathlib.Path(basegraph).resolve()
+        if not isinstance(basegraph, pathlib.Path):
+            raise TypeError("basegraph must be valid path type or None.")
+        if basegraph.is_file():
+            basegraph = basegraph.parent
+        if not basegraph.is_dir():
+            raise FileNotFoundError(f"basegraph ({basegraph}) does not exist.")
+        return basegraph
+
+    @staticmethod
+    def prep_lazy(lazy: bool) -> bool:
+        if not isinstance(lazy, bool):
+            raise TypeError("lazy only accepts type `bool`.")
+        return lazy
+
     @staticmethod
     def prep_export(export: bool) -> bool:
         if not isinstance(export, bool):
@@ -0,0 +1,298 @@
+import itertools
+import multiprocessing
+import typing
+from multiprocessing import shared_memory
+
+import joblib
+import numpy as np
+import numpy.typing as npt
+import torch
+import tqdm
+
+from optsent.abstract import Object, IModel, IObjective
+from optsent.data import Graph, LazyGraph, SentenceCollection, SparseGraph
+from optsent.objectives import _embed_batch
+
+
+def evaluate_tile(
+    objective: IObjective,
+    model: IModel,
+    sents1: typing.List[str],
+    sents2: typing.List[str],
+    rows: npt.NDArray[np.intp],
+    cols: npt.NDArray[np.intp],
+    dtype: npt.DTypeLike = np.float64,
+) -> npt.NDArray[np.floating]:
+    if hasattr(objective, "evaluate_block"):
+        values = np.asarray(objective.evaluate_block(sents1, sents2, model), dtype)
+    else:
+        values = np.full((len(sents1), len(sents2)), np.nan, dtype=dtype)
+        for (r, sent1), (c, sent2) in itertools.product(
+            enumerate(sents1), enumerate(sents2)
+        ):
+            if rows[r] != cols[c]:
+                values[r, c] = objective.evaluate(sent1, sent2, model)
+    _, diag_rows, diag_cols = np.intersect1d(
+        rows, cols, assume_unique=True, return_indices=True
+    )
+    values[diag_rows, diag_cols] = np.nan
+    return values
+
+
+_WORKER: typing.Dict[str, typing.Any] = {}
+
+
+def _init_worker(
+    objective: IObjective,
+    model: IModel,
+    sents: typing.List[str],
+    name: str,
+    shape: typing.Tuple[int, int],
+    dtype: np.dtype,
+    nthreads: int,
+) -> None:
+    torch.set_num_threads(nthreads)
+    shm = shared_memory.SharedMemory(name=name)
+    _WORKER.update(
+        objective=objective,
+        model=model,
+        sents=sents,
+        shm=shm,
+        matrix=np.ndarray(shape, dtype, buffer=shm.buf),
+    )
+
+
+def _write_tile(tile: typing.Tuple[npt.NDArray[np.int64], ...]) -> None:
+    rows, cols = tile
+    sents = _WORKER["sents"]
+    _WORKER["matrix"][np.ix_(rows, cols)] = evaluate_tile(
+        _WORKER["objective"],
+        _WORKER["model"],
+        [sents[r] for r in rows],
+        [sents[c] for c in cols],
+        rows,
+        cols,
+        _WORKER["matrix"].dtype,
+    )
+
+
+class GraphBuilder(Object):
+    _tile_cells = 2**20
+
+    def __init__(
+        self,
+        objective: IObjective,
+        model: IModel,
+        backend: str = "thread",
+        blocksize: int = -1,
+        ncores: int = 1,
+        prune: int = -1,
+    ) -> None:
+        super().__init__()
+        if backend not in self.supported_backends():
+            raise ValueError(f"backend must be one of {self.supported_backends()}.")
+        if not (prune == -1 or prune > 0):
+            raise ValueError("prune must be >0 or -1 for exhaustive.")
+        self._objective = objective
+        self._model = model
+        self._backend = backend
+        self._blocksize = blocksize
+        self._ncores = ncores
+        self._prune = prune
+
+    @classmethod
+    def supported_backends(cls) -> typing.Set[str]:
+        return {"thread", "process"}
+
+    def _tiles(
+        self, rows: npt.NDArray[np.int64], cols: npt.NDArray[np.int64]
+    ) -> typing.List[typing.Tuple[npt.NDArray[np.int64], ...]]:
+        row_step = col_step = self._blocksize
+        if self._blocksize <= 0 and getattr(self._objective, "vectorized", False):
+            col_step = max(cols.size, 1)
+            nworkers = joblib.effective_n_jobs(self._ncores)
+            row_step = max(
+                1, min(self._tile_cells // col_step, -(-rows.size // nworkers))
+            )
+        elif self._blocksize <= 0:
+            row_step = col_step = 32
+        row_blocks = [rows[i : i + row_step] for i in range(0, rows.size, row_step)]
+        col_blocks = [cols[i : i + col_step] for i in range(0, cols.size, col_step)]
+        return list(itertools.product(row_blocks, col_blocks))
+
+    def _encode(self, sents: typing.List[str]) -> None:
+        if hasattr(self._model, "encode"):
+            self._model.encode(sents)
+
+    def _build_threaded(
+        self, sents: typing.List[str], graph: Graph, tiles: typing.List
+    ) -> None:
+        def write_tile(rows, cols):
+            values = evaluate_tile(
+                self._objective,
+                self._model,
+                [sents[r] for r in rows],
+                [sents[c] for c in cols],
+                rows,
+                cols,
+                graph.dtype,
+            )
+            graph.write_transition_tile(rows, cols, values)
+
+        with joblib.parallel_backend("threading", n_jobs=self._ncores):
+            joblib.Parallel()(
+                joblib.delayed(write_tile)(rows, cols)
+                for rows, cols in tqdm.tqdm(tiles)
+            )
+
+    def _build_processes(
+        self, sents: typing.List[str], coll: SentenceCollection, tiles: typing.List
+    ) -> None:
+        nworkers = joblib.effective_n_jobs(self._ncores)
+        nthreads = max(1, multiprocessing.cpu_count() // nworkers)
+        dtype = coll.graph.matrix.dtype
+        shape = (coll.size, coll.size)
+        shm = shared_memory.SharedMemory(
+            create=True, size=int(np.prod(shape)) * dtype.itemsize
+        )
+        initargs = (
+            self._objective,
+            self._model,
+            sents,
+            shm.name,
+            shape,
+            dtype,
+            nthreads,
+        )
+        try:
+            matrix: npt.NDArray = np.ndarray(shape, dtype, buffer=shm.buf)
+            np.copyto(matrix, coll.graph.matrix)
+            coll.graph = Graph.from_matrix(matrix)
+            del matrix
+            context = multiprocessing.get_context("spawn")
+            with context.Pool(nworkers, _init_worker, initargs) as pool:
+                for _ in tqdm.tqdm(
+                    pool.imap_unordered(_write_tile, tiles), total=len(tiles)
+                ):
+                    pass
+        finally:
+            coll.graph = Graph.from_matrix(np.array(coll.graph.matrix))
+            shm.close()
+            shm.unlink()
+
+    def _run(self, coll: SentenceCollection, tiles: typing.List) -> None:
+        sents = coll.sentences.tolist()
+        backend = self._backend
+        if backend == "process" and isinstance(coll.graph, SparseGraph):
+            self.warn("Sparse graphs are built with the thread backend.")
+            backend = "thread"
+        self.info(f"Evaluating {len(tiles)} blocks with {backend} backend.")
+        if backend == "thread":
+            self._encode(sents)
+            self._build_threaded(sents, coll.graph, tiles)
+        else:
+            self._build_processes(sents, coll, tiles)
+
+    def _candidates(
+        self, sents: typing.List[str], maximize: bool
+    ) -> npt.NDArray[np.int64]:
+        embedding = _embed_batch(self._model, sents)
+        embedding /= np.linalg.norm(embedding, axis=1, keepdims=True)
+        k = min(self._prune, len(sents) - 1)
+        sign = 1.0 if maximize else -1.0
+        candidates = np.empty((len(sents), k), dtype=np.int64)
+        step = max(1, 2**24 // max(len(sents), 1))
+        for start in range(0, len(sents), step):
+            block = slice(start, min(start + step, len(sents)))
+            sims = sign * (embedding[block] @ embedding.T)
+            sims[np.arange(sims.shape[0]), np.arange(block.start, block.stop)] = -np.inf
+            candidates[block] = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        return candidates
+
+    def _build_pruned(self, coll: SentenceCollection) -> None:
+        sents = coll.sentences.tolist()
+        self.info(f"Selecting {self._prune} candidates per string by embedding.")
+        candidates = self._candidates(sents, getattr(coll.graph, "maximize", False))
+        self._encode(sents)
+        if self._backend == "process":
+            self.warn("Pruned graphs are built with the thread backend.")
+        step = self._blocksize if self._blocksize > 0 else 32
+        blocks = [
+            np.arange(i, min(i + step, coll.size)) for i in range(0, coll.size, step)
+        ]
+
+        def write_rows(rows):
+            for row in rows:
+                cols = candidates[row]
+                values = evaluate_tile(
+                    self._objective,
+                    self._model,
+                    [sents[row]],
+                    [sents[c] for c in cols],
+                    np.array([row]),
+                    cols,
+                    coll.graph.dtype,
+                )
+                coll.graph.write_transition_tile([row], cols, values)
+
+        self.info(f"Evaluating {candidates.size} candidate transitions.")
+        with joblib.parallel_backend("threading", n_jobs=self._ncores):
+            joblib.Parallel()(
+                joblib.delayed(write_rows)(rows) for rows in tqdm.tqdm(blocks)
+            )
+
+    def build(self, coll: SentenceCollection) -> None:
+        if not isinstance(coll, SentenceCollection):
+            raise TypeError("GraphBuilder can only build `SentenceCollection` graphs.")
+        if self._prune > 0 and coll.size > 1:
+            self._build_pruned(coll)
+            return
+        indices = np.arange(coll.size)
+        self._run(coll, self._tiles(indices, indices))
+
+    def update(
+        self,
+        coll: SentenceCollection,
+        base_sents: typing.Sequence[str],
+        base_matrix: npt.NDArray,
+    ) -> None:
+        if not isinstance(coll, SentenceCollection):
+            raise TypeError("GraphBuilder can only update `SentenceCollection` graphs.")
+        if base_matrix.shape != (len(base_sents), len(base_sents)):
+            raise ValueError("base_matrix must match base_sents.")
+        positions: typing.Dict[str, typing.List[int]] = {}
+        for idx, sent in enumerate(base_sents):
+            positions.setdefault(sent, []).append(idx)
+        mapping = np.array(
+            [positions[s].pop(0) if positions.get(s) else -1 for s in coll.sentences]
+        )
+        kept, added = np.where(mapping >= 0)[0], np.where(mapping < 0)[0]
+        self.info(
+            f"Reusing {kept.size} strings, adding {added.size}, "
+            f"dropping {len(base_sents) - kept.size}."
+        )
+        coll.graph.write_transition_tile(
+            kept, kept, base_matrix[np.ix_(mapping[kept], mapping[kept])]
+        )
+        tiles = self._tiles(added, np.arange(coll.size)) + self._tiles(kept, added)
+        self._run(coll, tiles)
+
+    def attach_lazy(self, coll: SentenceCollection) -> None:
+        if not isinstance(coll, SentenceCollection):
+            raise TypeError("GraphBuilder can only attach `SentenceCollection` graphs.")
+        sents = coll.sentences.tolist()
+        cols = np.arange(coll.size)
+        self._encode(sents)
+
+        def compute(rows: npt.NDArray[np.int64]) -> npt.NDArray[np.float64]:
+            return evaluate_tile(
+                self._objective,
+                self._model,
+                [sents[r] for r in rows],
+                sents,
+                rows,
+                cols,
+                coll.graph.dtype,
+            )
+
+        coll.graph = LazyGraph(coll.size, compute, coll.graph.dtype)
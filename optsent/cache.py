@@ -0,0 +1,160 @@
+import collections
+import hashlib
+import pathlib
+import sqlite3
+import threading
+import typing
+
+import numpy as np
+import numpy.typing as npt
+
+from optsent.abstract import Object
+
+
+class Cache(Object):
+    def __init__(
+        self,
+        model_id: str,
+        revision: str,
+        cachedir: typing.Optional[pathlib.Path] = None,
+        capacity: int = 65536,
+    ) -> None:
+        super().__init__()
+        if not all(isinstance(arg, str) for arg in (model_id, revision)):
+            raise TypeError("model_id and revision must be type `str`.")
+        if not (cachedir is None or isinstance(cachedir, pathlib.Path)):
+            raise TypeError("cachedir must be valid path type or None.")
+        if not isinstance(capacity, int):
+            raise TypeError("capacity must be type `int`.")
+        if not capacity > 0:
+            raise ValueError("capacity must be >0.")
+        self._model_id = model_id
+        self._revision = revision
+        self._cachedir = cachedir
+        self._capacity = capacity
+        self._hits = 0
+        self._misses = 0
+        self._open()
+
+    def __getstate__(self) -> typing.Dict[str, typing.Any]:
+        state = self.__dict__.copy()
+        for key in ("_memory", "_lock", "_conn"):
+            del state[key]
+        return state
+
+    def __setstate__(self, state: typing.Dict[str, typing.Any]) -> None:
+        self.__dict__.update(state)
+        self._open()
+
+    def _open(self) -> None:
+        cachedir = self._cachedir
+        self._memory: collections.OrderedDict = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: typing.Optional[sqlite3.Connection] = None
+        if cachedir is not None:
+            cachedir.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(
+                cachedir / "optsent.sqlite", timeout=60.0, check_same_thread=False
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "model TEXT, revision TEXT, method TEXT, digest TEXT, "
+                "dtype TEXT, value BLOB, "
+                "PRIMARY KEY (model, revision, method, digest))"
+            )
+            self._conn.commit()
+            self.info(f"Opened persistent cache at {cachedir}.")
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    @property
+    def cachedir(self) -> typing.Optional[pathlib.Path]:
+        return self._cachedir
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def persistent(self) -> bool:
+        return self._conn is not None
+
+    @staticmethod
+    def _digest(sent: str) -> str:
+        return hashlib.sha256(sent.encode()).hexdigest()
+
+    def _remember(self, key: typing.Tuple[str, str], value: npt.NDArray) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._capacity:
+            self._memory.popitem(last=False)
+
+    def _select(
+        self, method: str, digests: typing.List[str]
+    ) -> typing.Dict[str, npt.NDArray]:
+        assert self._conn is not None
+        found = {}
+        for start in range(0, len(digests), 512):
+            chunk = digests[start : start + 512]
+            rows = self._conn.execute(
+                "SELECT digest, dtype, value FROM entries "
+                "WHERE model = ? AND revision = ? AND method = ? "
+                f"AND digest IN ({','.join('?' * len(chunk))})",
+                (self._model_id, self._revision, method, *chunk),
+            ).fetchall()
+            for digest, dtype, value in rows:
+                found[digest] = np.frombuffer(value, dtype=dtype)
+        return found
+
+    def lookup(
+        self, method: str, sents: typing.Iterable[str]
+    ) -> typing.Dict[str, npt.NDArray]:
+        found, missing = {}, {}
+        with self._lock:
+            for sent in dict.fromkeys(sents):
+                key = (method, sent)
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[sent] = self._memory[key]
+                else:
+                    missing[self._digest(sent)] = sent
+            if missing and self._conn is not None:
+                for digest, value in self._select(method, list(missing)).items():
+                    sent = missing.pop(digest)
+                    self._remember((method, sent), value)
+                    found[sent] = value
+            self._hits += len(found)
+            self._misses += len(missing)
+        return found
+
+    def update(self, method: str, values: typing.Dict[str, npt.NDArray]) -> None:
+        with self._lock:
+            for sent, value in values.items():
+                self._remember((method, sent), value)
+            if self._conn is not None:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            self._model_id,
+                            self._revision,
+                            method,
+                            self._digest(sent),
+                            value.dtype.str,
+                            value.tobytes(),
+                        )
+                        for sent, value in values.items()
+                    ],
+                )
+                self._conn.commit()
+
+    def log_stats(self) -> None:
+        total = self._hits + self._misses
+        rate = self._hits / total if total else 0.0
+        self.info(f"Cache hits {self._hits}, misses {self._misses} ({rate:.1%}).")
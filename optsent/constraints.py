@@ -0,0 +1,133 @@
+import abc
+import collections
+import re
+import typing
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from optsent.abstract import Object
+from optsent.data import SentenceCollection
+
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from had has have he her his i in is it its "
+    "of on or she that the their there they this to was were will with you".split()
+)
+
+
+def _tokenize(string: str) -> typing.List[str]:
+    return re.sub(r"[^A-Za-z0-9 ]+", "", string).lower().split()
+
+
+class Constraint(Object):
+    _registry: typing.Dict[str, typing.Callable] = {}
+
+    def __init__(self, constraint_id: str) -> None:
+        super().__init__()
+        if not isinstance(constraint_id, str):
+            raise TypeError("constraint_id must be type `str`.")
+        self._id = constraint_id
+        self._kernels = []
+        for spec in constraint_id.split(","):
+            name, _, arg = spec.strip().partition("=")
+            try:
+                kernel = self.supported_constraints()[name]
+            except KeyError as invalid_constraint:
+                raise ValueError(
+                    f"constraint must be in supported: {self.supported_constraints().keys()}"
+                ) from invalid_constraint
+            self._kernels.append(kernel(arg or None))
+        self.info(f"Defined {self._id} constraint.")
+
+    @classmethod
+    def _builtin_constraints(cls) -> typing.Dict[str, typing.Callable]:
+        return {
+            "none": _NoConstraint,
+            "repeats": _BoundaryRepeats,
+            "content": _SharedContentWords,
+            "length": _LengthDifference,
+            "condition": _SameCondition,
+        }
+
+    @classmethod
+    def supported_constraints(cls) -> typing.Dict[str, typing.Callable]:
+        return {**cls._registry, **cls._builtin_constraints()}
+
+    @classmethod
+    def register(cls, name: str, kernel: typing.Callable) -> None:
+        if not isinstance(name, str):
+            raise TypeError("name must be type `str`.")
+        if not (isinstance(kernel, type) and issubclass(kernel, _ConstraintKernel)):
+            raise TypeError("kernel must subclass `_ConstraintKernel`.")
+        if name in cls._builtin_constraints():
+            raise ValueError(f"constraint `{name}` is built in and cannot be replaced.")
+        cls._registry[name] = kernel
+
+    def __call__(self, sents: SentenceCollection) -> npt.NDArray[np.bool_]:
+        allowed = np.ones((sents.size, sents.size), dtype=bool)
+        for kernel in self._kernels:
+            allowed &= kernel(sents)
+        return allowed
+
+
+class _ConstraintKernel(Object):
+    def __init__(self, arg: typing.Optional[str] = None) -> None:
+        super().__init__()
+        self._arg = arg
+
+    @abc.abstractmethod
+    def __call__(self, sents: SentenceCollection) -> npt.NDArray[np.bool_]:
+        raise NotImplementedError()  # pragma: no cover
+
+
+class _NoConstraint(_ConstraintKernel):
+    def __call__(self, sents: SentenceCollection) -> npt.NDArray[np.bool_]:
+        return np.ones((sents.size, sents.size), dtype=bool)
+
+
+class _BoundaryRepeats(_ConstraintKernel):
+    def __call__(self, sents: SentenceCollection) -> npt.NDArray[np.bool_]:
+        tokens = [_tokenize(string) for string in sents.sentences]
+        boundaries = [t[-1] if t else None for t in tokens]
+        boundaries += [t[0] if t else None for t in tokens]
+        codes, _ = pd.factorize(pd.Series(boundaries, dtype=object))
+        last, first = codes[: sents.size, None], codes[None, sents.size :]
+        return (last != first) | (last < 0)
+
+
+class _SharedContentWords(_ConstraintKernel):
+    def __call__(self, sents: SentenceCollection) -> npt.NDArray[np.bool_]:
+        postings = collections.defaultdict(list)
+        for idx, string in enumerate(sents.sentences):
+            for word in set(_tokenize(string)) - _STOPWORDS:
+                postings[word].append(idx)
+        allowed = np.ones((sents.size, sents.size), dtype=bool)
+        for indices in postings.values():
+            if len(indices) > 1:
+                allowed[np.ix_(indices, indices)] = False
+        return allowed
+
+
+class _LengthDifference(_ConstraintKernel):
+    def __init__(self, arg: typing.Optional[str] = None) -> None:
+        super().__init__(arg)
+        try:
+            self._limit = int(arg) if arg is not None else 5
+        except ValueError as invalid_limit:
+            raise ValueError(
+                "length constraint must be `length=<int>`."
+            ) from invalid_limit
+
+    def __call__(self, sents: SentenceCollection) -> npt.NDArray[np.bool_]:
+        lengths = np.array([len(_tokenize(string)) for string in sents.sentences])
+        return np.abs(lengths[:, None] - lengths[None, :]) <= self._limit
+
+
+class _SameCondition(_ConstraintKernel):
+    def __call__(self, sents: SentenceCollection) -> npt.NDArray[np.bool_]:
+        column = self._arg or "Condition"
+        if column not in sents.metadata.columns:
+            raise ValueError(f"condition constraint requires `{column}` input column.")
+        codes, _ = pd.factorize(sents.metadata[column])
+        return (codes[:, None] != codes[None, :]) | (codes[:, None] < 0)
@@ -1,3 +1,6 @@
+import threading
+import typing
+
 import numpy as np
 import numpy.typing as npt
 import pandas as pd
@@ -6,23 +9,83 @@ from optsent.abstract import Object
 
 
 class Graph(Object):
-    def __init__(self, size: int) -> None:
+    def __init__(self, size: int, dtype: npt.DTypeLike = np.float64) -> None:
         super().__init__()
         if not isinstance(size, int):
             raise TypeError("size must be type `int.`")
         if not size > 1:
             raise ValueError("size must be >1.")
+        if np.dtype(dtype) not in (np.float32, np.float64):
+            raise ValueError("dtype must be float32 or float64.")
         self._dim = size
-        self._matrix = np.zeros((self.dim, self.dim), dtype=np.float64)
+        self._dtype = np.dtype(dtype)
+        self._allocate()
+
+    def _allocate(self) -> None:
+        self._matrix = np.zeros((self.dim, self.dim), dtype=self._dtype)
+
+    @classmethod
+    def from_matrix(cls, matrix: npt.NDArray) -> "Graph":
+        if not isinstance(matrix, np.ndarray):
+            raise TypeError("matrix must be type `np.ndarray`.")
+        if not (matrix.ndim == 2 and matrix.shape[0] == matrix.shape[1]):
+            raise ValueError("matrix must be square.")
+        graph = cls(int(matrix.shape[0]), matrix.dtype)
+        graph._matrix = matrix
+        return graph
 
     @property
     def dim(self) -> int:
         return self._dim
 
     @property
-    def matrix(self) -> npt.NDArray[np.float64]:
+    def dtype(self) -> np.dtype:
+        return self._dtype
+
+    @property
+    def matrix(self) -> npt.NDArray[np.floating]:
         return self._matrix
 
+    def row(self, i: int) -> npt.NDArray[np.floating]:
+        return np.array(self._matrix[i, :])
+
+    def rows(self, indices: npt.ArrayLike) -> npt.NDArray[np.floating]:
+        return np.asarray(self._matrix[np.asarray(indices)])
+
+    def weights(
+        self, rows: npt.ArrayLike, cols: npt.ArrayLike
+    ) -> npt.NDArray[np.floating]:
+        return np.asarray(self._matrix[np.asarray(rows), np.asarray(cols)])
+
+    def column_extremum(self, maximize: bool) -> npt.NDArray[np.floating]:
+        reduce = np.fmax if maximize else np.fmin
+        extremum = np.full(self.dim, np.nan, dtype=self.dtype)
+        for start in range(0, self.dim, 1024):
+            extremum = reduce(
+                extremum, reduce.reduce(self._matrix[start : start + 1024])
+            )
+        return extremum
+
+    def is_empty(self) -> bool:
+        return bool(np.all(self._matrix == 0))
+
+    def _check_tile(
+        self, rows: npt.NDArray, cols: npt.NDArray, values: npt.NDArray
+    ) -> None:
+        if not all(np.issubdtype(idx.dtype, np.integer) for idx in (rows, cols)):
+            raise TypeError("rows and cols must be `int` indices.")
+        if values.shape != (rows.size, cols.size):
+            raise ValueError("values must have shape (len(rows), len(cols)).")
+        if np.any(rows >= self.dim) or np.any(cols >= self.dim):
+            raise ValueError(f"rows and cols must be in range [0, {self.dim})")
+        if not np.issubdtype(values.dtype, np.number):
+            raise TypeError("values must be numeric.")
+
+    def _write_tile(
+        self, rows: npt.NDArray, cols: npt.NDArray, values: npt.NDArray
+    ) -> None:
+        self._matrix[np.ix_(rows, cols)] = values
+
     def write_transition_weight(self, i: int, j: int, value: float) -> None:
         if not isinstance(i, int) and isinstance(j, int):
             raise TypeError("i and j must be `int` indices.")
@@ -30,14 +93,244 @@ class Graph(Object):
             raise ValueError(f"i and j must be in range [0, {self.dim})")
         if not issubclass(value.__class__, (float, int)):
             raise TypeError("value must be subtype of `float` or `int`")
-        self._matrix[i, j] = np.float64(value)
+        self._write_tile(np.array([i]), np.array([j]), np.array([[value]]))
+
+    def write_transition_block(self, i: int, j: int, values: npt.ArrayLike) -> None:
+        if not (isinstance(i, int) and isinstance(j, int)):
+            raise TypeError("i and j must be `int` offsets.")
+        values = np.asarray(values)
+        if values.ndim != 2:
+            raise ValueError("values must be a 2D block.")
+        if i + values.shape[0] > self.dim or j + values.shape[1] > self.dim:
+            raise ValueError(f"block must fit in range [0, {self.dim})")
+        if not np.issubdtype(values.dtype, np.number):
+            raise TypeError("values must be numeric.")
+        rows = np.arange(i, i + values.shape[0])
+        cols = np.arange(j, j + values.shape[1])
+        self._write_tile(rows, cols, values)
+
+    def write_transition_tile(
+        self, rows: npt.ArrayLike, cols: npt.ArrayLike, values: npt.ArrayLike
+    ) -> None:
+        rows, cols, values = np.asarray(rows), np.asarray(cols), np.asarray(values)
+        self._check_tile(rows, cols, values)
+        self._write_tile(rows, cols, values)
+
+
+class SparseGraph(Graph):
+    def __init__(
+        self,
+        size: int,
+        k: int,
+        maximize: bool = False,
+        dtype: npt.DTypeLike = np.float64,
+    ) -> None:
+        if not isinstance(k, int):
+            raise TypeError("k must be type `int`.")
+        if not k > 0:
+            raise ValueError("k must be >0.")
+        self._k = k
+        self._maximize = maximize
+        self._lock = threading.Lock()
+        super().__init__(size, dtype)
+
+    def _allocate(self) -> None:
+        self._k = min(self._k, self.dim)
+        self._indices = np.full((self.dim, self._k), -1, dtype=np.int32)
+        self._values = np.full((self.dim, self._k), np.nan, dtype=self._dtype)
+
+    @classmethod
+    def from_arrays(
+        cls, indices: npt.NDArray, values: npt.NDArray, maximize: bool = False
+    ) -> "SparseGraph":
+        if not all(isinstance(arr, np.ndarray) for arr in (indices, values)):
+            raise TypeError("indices and values must be type `np.ndarray`.")
+        if not (indices.ndim == 2 and indices.shape == values.shape):
+            raise ValueError("indices and values must be matching 2D arrays.")
+        graph = cls(
+            int(indices.shape[0]), int(indices.shape[1]), maximize, values.dtype
+        )
+        graph._indices = indices
+        graph._values = values
+        return graph
+
+    @classmethod
+    def from_dense(
+        cls, matrix: npt.NDArray, k: int, maximize: bool = False
+    ) -> "SparseGraph":
+        if not isinstance(matrix, np.ndarray):
+            raise TypeError("matrix must be type `np.ndarray`.")
+        if not (matrix.ndim == 2 and matrix.shape[0] == matrix.shape[1]):
+            raise ValueError("matrix must be square.")
+        graph = cls(int(matrix.shape[0]), k, maximize, matrix.dtype)
+        cols = np.arange(graph.dim)
+        for start in range(0, graph.dim, 1024):
+            rows = cols[start : start + 1024]
+            graph.write_transition_tile(rows, cols, matrix[rows])
+        return graph
+
+    @property
+    def k(self) -> int:
+        return self._k
+
+    @property
+    def maximize(self) -> bool:
+        return self._maximize
+
+    @property
+    def indices(self) -> npt.NDArray[np.int32]:
+        return self._indices
+
+    @property
+    def values(self) -> npt.NDArray[np.floating]:
+        return self._values
+
+    @property
+    def matrix(self) -> npt.NDArray[np.floating]:
+        matrix = np.full((self.dim, self.dim), np.nan, dtype=self.dtype)
+        rows, slots = np.nonzero(self._indices >= 0)
+        matrix[rows, self._indices[rows, slots]] = self._values[rows, slots]
+        return matrix
+
+    def row(self, i: int) -> npt.NDArray[np.floating]:
+        row = np.full(self.dim, np.nan, dtype=self.dtype)
+        valid = self._indices[i] >= 0
+        row[self._indices[i, valid]] = self._values[i, valid]
+        return row
+
+    def rows(self, indices: npt.ArrayLike) -> npt.NDArray[np.floating]:
+        indices = np.asarray(indices)
+        rows = np.full((indices.size, self.dim), np.nan, dtype=self.dtype)
+        slots, cols = np.nonzero(self._indices[indices] >= 0)
+        targets = self._indices[indices[slots], cols]
+        rows[slots, targets] = self._values[indices[slots], cols]
+        return rows
+
+    def weights(
+        self, rows: npt.ArrayLike, cols: npt.ArrayLike
+    ) -> npt.NDArray[np.floating]:
+        rows, cols = np.asarray(rows), np.asarray(cols)
+        matches = self._indices[rows] == cols[..., None]
+        slot = np.argmax(matches, axis=-1)[..., None]
+        values = np.take_along_axis(self._values[rows], slot, axis=-1)[..., 0]
+        return np.where(matches.any(axis=-1), values, np.nan)
+
+    def column_extremum(self, maximize: bool) -> npt.NDArray[np.floating]:
+        extremum = np.full(self.dim, np.nan, dtype=self.dtype)
+        valid = (self._indices >= 0) & ~np.isnan(self._values)
+        reduce = np.fmax if maximize else np.fmin
+        reduce.at(extremum, self._indices[valid], self._values[valid])
+        return extremum
+
+    def is_empty(self) -> bool:
+        return bool(np.all(self._indices < 0))
+
+    def _write_tile(
+        self, rows: npt.NDArray, cols: npt.NDArray, values: npt.NDArray
+    ) -> None:
+        with self._lock:
+            indices = np.concatenate(
+                (self._indices[rows], np.broadcast_to(cols, values.shape)), axis=1
+            )
+            merged = np.concatenate((self._values[rows], values), axis=1)
+            merged[:, : self._k][np.isin(self._indices[rows], cols)] = np.nan
+            key = merged if self._maximize else -merged
+            key = np.where(np.isnan(key) | (indices < 0), -np.inf, key)
+            best = np.argpartition(-key, self._k - 1, axis=1)[:, : self._k]
+            best_values = np.take_along_axis(merged, best, axis=1)
+            best_indices = np.take_along_axis(indices, best, axis=1)
+            best_indices[np.isnan(best_values)] = -1
+            self._indices[rows] = best_indices
+            self._values[rows] = best_values
+
+
+class LazyGraph(Graph):
+    def __init__(
+        self,
+        size: int,
+        compute: typing.Callable[[npt.NDArray[np.int64]], npt.NDArray],
+        dtype: npt.DTypeLike = np.float64,
+        probe: int = 64,
+    ) -> None:
+        if not callable(compute):
+            raise TypeError("compute must be callable.")
+        if not isinstance(probe, int):
+            raise TypeError("probe must be type `int`.")
+        if not probe > 0:
+            raise ValueError("probe must be >0.")
+        self._compute = compute
+        self._probe = probe
+        self._lock = threading.Lock()
+        super().__init__(size, dtype)
+
+    def _allocate(self) -> None:
+        self._rows: typing.Dict[int, npt.NDArray[np.floating]] = {}
+
+    @property
+    def computed(self) -> int:
+        return len(self._rows)
+
+    @property
+    def matrix(self) -> npt.NDArray[np.floating]:
+        return self.rows(np.arange(self.dim))
+
+    def _ensure(self, indices: typing.Iterable[int]) -> None:
+        with self._lock:
+            missing = [i for i in dict.fromkeys(indices) if i not in self._rows]
+            if missing:
+                values = np.asarray(self._compute(np.array(missing)), dtype=self.dtype)
+                self._rows.update(zip(missing, values))
+
+    def row(self, i: int) -> npt.NDArray[np.floating]:
+        self._ensure([int(i)])
+        return self._rows[int(i)].copy()
+
+    def rows(self, indices: npt.ArrayLike) -> npt.NDArray[np.floating]:
+        order = np.asarray(indices, dtype=np.intp).ravel().tolist()
+        self._ensure(order)
+        rows = np.empty((len(order), self.dim), dtype=self.dtype)
+        for slot, i in enumerate(order):
+            rows[slot] = self._rows[i]
+        return rows
+
+    def weights(
+        self, rows: npt.ArrayLike, cols: npt.ArrayLike
+    ) -> npt.NDArray[np.floating]:
+        rows, cols = np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp)
+        unique, inverse = np.unique(rows, return_inverse=True)
+        stacked = self.rows(unique)
+        return stacked[inverse.reshape(rows.shape), cols]
+
+    def column_extremum(self, maximize: bool) -> npt.NDArray[np.floating]:
+        if not self._rows:
+            probe = np.linspace(0, self.dim - 1, min(self._probe, self.dim))
+            self._ensure(np.unique(probe.astype(int)).tolist())
+        reduce = np.fmax if maximize else np.fmin
+        with self._lock:
+            return reduce.reduce(np.stack(list(self._rows.values())), axis=0)
+
+    def is_empty(self) -> bool:
+        return False
+
+    def _write_tile(
+        self, rows: npt.NDArray, cols: npt.NDArray, values: npt.NDArray
+    ) -> None:
+        raise RuntimeError("LazyGraph rows are computed on demand.")
 
 
 class SentenceCollection(Object):
-    def __init__(self, inputs: pd.Series) -> None:
+    def __init__(
+        self, inputs: pd.Series, metadata: typing.Optional[pd.DataFrame] = None
+    ) -> None:
         super().__init__()
         if not isinstance(inputs, pd.Series):
             raise TypeError("inputs must be type `pd.Series`")
+        if metadata is None:
+            metadata = pd.DataFrame(index=inputs.index)
+        if not isinstance(metadata, pd.DataFrame):
+            raise TypeError("metadata must be type `pd.DataFrame`")
+        if not metadata.index.equals(inputs.index):
+            raise ValueError("metadata must share the inputs index")
         if not inputs.size > 1:
             raise ValueError("inputs must have at least 2 elements")
         if not all(isinstance(i, str) for i in inputs):
@@ -45,6 +338,7 @@ class SentenceCollection(Object):
         if not inputs.name == "Sentence":
             inputs.name = "Sentence"
         self._sentences = inputs
+        self._metadata = metadata
         self._graph = Graph(self.size)
         self.info(f"Built collection of {self.size} sentences.")
 
@@ -52,6 +346,10 @@ class SentenceCollection(Object):
     def sentences(self) -> pd.Series:
         return self._sentences
 
+    @property
+    def metadata(self) -> pd.DataFrame:
+        return self._metadata
+
     @property
     def size(self) -> int:
         return self.sentences.size
@@ -59,3 +357,11 @@ class SentenceCollection(Object):
     @property
     def graph(self) -> Graph:
         return self._graph
+
+    @graph.setter
+    def graph(self, graph: Graph) -> None:
+        if not isinstance(graph, Graph):
+            raise TypeError("graph must be type `Graph`.")
+        if not graph.dim == self.size:
+            raise ValueError("graph must match collection size.")
+        self._graph = graph
@@ -1,19 +1,58 @@
-import functools
+import contextlib
+import copy
+import pathlib
+import time
+import typing
 
 import numpy as np
 import numpy.typing as npt
 import torch
 from transformers import AutoConfig, AutoTokenizer, AutoModelForCausalLM
+from transformers.pytorch_utils import Conv1D
 
 from optsent.abstract import Object
+from optsent.cache import Cache
 
 
 class Model(Object):
-    def __init__(self, model_id: str) -> None:
+    _calibration = (
+        "The quick brown fox jumps over the lazy dog.",
+        "She sells seashells by the seashore.",
+        "I went to the store to buy some bread and milk.",
+        "A journey of a thousand miles begins with a single step.",
+        "The committee postponed the vote until next week.",
+        "Colorless green ideas sleep furiously.",
+        "He could not remember where he had left his keys.",
+        "Rain is expected across the region by Sunday evening.",
+    )
+
+    def __init__(
+        self,
+        model_id: str,
+        batchsize: int = 16,
+        cachedir: typing.Optional[pathlib.Path] = None,
+        cachesize: int = 65536,
+        separator: typing.Optional[str] = None,
+        precision: str = "fp32",
+        calibrate: bool = False,
+    ) -> None:
         super().__init__()
         if not isinstance(model_id, str):
             raise TypeError("model_id must be type `str`.")
+        if not isinstance(batchsize, int):
+            raise TypeError("batchsize must be type `int`.")
+        if not batchsize > 0:
+            raise ValueError("batchsize must be >0.")
+        if not (separator is None or isinstance(separator, str)):
+            raise TypeError("separator must be type `str` or None.")
+        if not isinstance(precision, str):
+            raise TypeError("precision must be type `str`.")
+        if precision not in self.supported_precisions():
+            raise ValueError(f"precision must be one of {self.supported_precisions()}.")
+        if not isinstance(calibrate, bool):
+            raise TypeError("calibrate must be type `bool`.")
         self._id = model_id
+        self._batchsize = batchsize
         try:
             self._config = AutoConfig.from_pretrained(self._id)
             self._tokenizer = AutoTokenizer.from_pretrained(self._id)
@@ -23,9 +62,65 @@ class Model(Object):
             raise ValueError(
                 "model must be valid HuggingFace CausalLM."
             ) from invalid_id
+        if self._tokenizer.pad_token is None:
+            self._tokenizer.pad_token = self._tokenizer.eos_token
+        self._tokenizer.padding_side = "right"
+        self._separator = separator
+        self._separator_ids = self._tokenizer(
+            separator or "", add_special_tokens=False
+        )["input_ids"]
+        self._special_ids = self._tokenizer("")["input_ids"]
+        self._encodings: typing.Dict[str, typing.List[int]] = {}
         self._set_torch_device()
+        self._precision = "fp32"
+        if precision != "fp32":
+            self._set_precision(precision, calibrate)
+        revision = getattr(self._config, "_commit_hash", None) or "local"
+        if self._precision != "fp32":
+            revision = f"{revision}+{self._precision}"
+        self._cache = Cache(self._id, revision, cachedir, cachesize)
         self.info(f"Loaded pretrained {self._id} model on {self._device}.")
 
+    def __reduce__(self) -> typing.Tuple[typing.Callable, typing.Tuple]:
+        return (
+            self.__class__,
+            (
+                self._id,
+                self._batchsize,
+                self._cache.cachedir,
+                self._cache.capacity,
+                self._separator,
+                self._precision,
+                False,
+            ),
+        )
+
+    @classmethod
+    def supported_precisions(cls) -> typing.Set[str]:
+        return {"fp32", "bf16", "int8"}
+
+    @property
+    def precision(self) -> str:
+        return self._precision
+
+    @property
+    def batchsize(self) -> int:
+        return self._batchsize
+
+    @property
+    def separator(self) -> typing.Optional[str]:
+        return self._separator
+
+    @property
+    def cache(self) -> Cache:
+        return self._cache
+
+    @property
+    def supports_prefix_cache(self) -> bool:
+        return bool(getattr(self._config, "use_cache", False)) and not bool(
+            getattr(self._config, "is_encoder_decoder", False)
+        )
+
     def _set_torch_device(self) -> None:
         if torch.cuda.is_available():  # pragma: no cover
             self._device = torch.device("cuda")
@@ -41,30 +136,392 @@ class Model(Object):
             self._device = torch.device("cpu")
             self._model = self._model.to(self._device)
 
-    @functools.cache
-    def score(self, sent: str) -> float:
-        if not isinstance(sent, str):
-            raise TypeError("sent must be type `str` to get scored.")
+    @staticmethod
+    def _bf16_supported() -> bool:
+        try:
+            return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+        except (AttributeError, RuntimeError):  # pragma: no cover
+            return False
+
+    @staticmethod
+    def _linearize(module: torch.nn.Module) -> torch.nn.Module:
+        for parent in list(module.modules()):
+            for name, child in list(parent.named_children()):
+                if isinstance(child, Conv1D):
+                    linear = torch.nn.Linear(*child.weight.shape)
+                    linear.weight.data = child.weight.data.T.contiguous()
+                    linear.bias.data = child.bias.data
+                    setattr(parent, name, linear)
+        return module
+
+    def _autocast(self) -> typing.ContextManager:
+        if self._precision == "bf16":
+            return torch.autocast("cpu", dtype=torch.bfloat16)
+        return contextlib.nullcontext()
+
+    def _timed_logp(
+        self, encodings: typing.List[typing.List[int]]
+    ) -> typing.Tuple[npt.NDArray[np.float64], float]:
+        start = time.perf_counter()
+        logp = self._logp(encodings)
+        return logp, len(encodings) / max(time.perf_counter() - start, 1e-9)
+
+    def _apply_precision(self, precision: str) -> None:
+        if precision == "int8":
+            self._model = torch.ao.quantization.quantize_dynamic(
+                self._linearize(self._model), {torch.nn.Linear}, dtype=torch.qint8
+            )
+        self._precision = precision
+
+    def _set_precision(self, precision: str, calibrate: bool) -> None:
+        if self._device.type != "cpu":  # pragma: no cover
+            self.warn(f"{precision} precision is only applied on CPU, using fp32.")
+            return
+        if precision == "bf16" and not self._bf16_supported():
+            self.warn("CPU does not support bf16, using fp32.")
+            return
+        if not calibrate:
+            self._apply_precision(precision)
+            return
+        encodings = self._tokenizer(list(self._calibration))["input_ids"]
+        self._timed_logp(encodings)
+        reference, reference_rate = self._timed_logp(encodings)
+        self._apply_precision(precision)
+        self._timed_logp(encodings)
+        logp, rate = self._timed_logp(encodings)
+        self.info(
+            f"Using {precision} precision at {rate:.1f} strings/s "
+            f"(fp32 {reference_rate:.1f}), max logp deviation "
+            f"{np.max(np.abs(logp - reference)):.4f}."
+        )
+
+    def _buckets(
+        self, encodings: typing.List[typing.List[int]]
+    ) -> typing.Iterator[npt.NDArray[np.int64]]:
+        order = np.argsort([len(ids) for ids in encodings], kind="stable")
+        for start in range(0, order.size, self._batchsize):
+            yield order[start : start + self._batchsize]
+
+    def _logp(
+        self, encodings: typing.List[typing.List[int]]
+    ) -> npt.NDArray[np.float64]:
+        with torch.no_grad():
+            inputs = self._tokenizer.pad(
+                {"input_ids": encodings}, return_tensors="pt"
+            ).to(self._device)
+            with self._autocast():
+                logits = self._model(**inputs).logits.float()
+        return self._sequence_logp(
+            logits, inputs["input_ids"], inputs["attention_mask"]
+        )
+
+    @staticmethod
+    def _sequence_logp(
+        logits: torch.Tensor, tokens: torch.Tensor, mask: torch.Tensor
+    ) -> npt.NDArray[np.float64]:
         with torch.no_grad():
-            inputs = self._tokenizer(sent, return_tensors="pt").to(self._device)
-            tokens = inputs["input_ids"]
-            outputs = self._model(**inputs, labels=tokens)
             loss = torch.nn.CrossEntropyLoss(reduction="none")(
-                outputs.logits[..., :-1, :]
-                .contiguous()
-                .view(-1, outputs.logits.size(-1)),
+                logits[..., :-1, :].contiguous().view(-1, logits.size(-1)),
                 tokens[..., 1:].contiguous().view(-1),
             ).view(tokens.size(0), tokens.size(-1) - 1)
-            loss = (loss * inputs["attention_mask"][..., 1:].contiguous()).sum(dim=1)
-            logp = -loss.cpu().detach().item()
-        return logp
+            loss = (loss * mask[..., 1:].contiguous()).sum(dim=1)
+        return -loss.cpu().detach().numpy().astype(np.float64)
+
+    @staticmethod
+    def _shared_prefix(encodings: typing.List[typing.List[int]]) -> int:
+        shared = min(len(encoding) for encoding in encodings) - 1
+        for ids in encodings[1:]:
+            while shared > 0 and ids[:shared] != encodings[0][:shared]:
+                shared -= 1
+        return shared
+
+    @staticmethod
+    def _expand_past(past: typing.Any, size: int) -> typing.Any:
+        if isinstance(past, tuple):
+            return tuple(
+                tuple(tensor.expand(size, *tensor.shape[1:]) for tensor in layer)
+                for layer in past
+            )
+        past = copy.deepcopy(past)
+        past.batch_repeat_interleave(size)
+        return past
+
+    def _logp_continuations(
+        self, encodings: typing.List[typing.List[int]], shared: int
+    ) -> typing.Iterator[typing.Tuple[npt.NDArray[np.int64], npt.NDArray[np.float64]]]:
+        lossfn = torch.nn.CrossEntropyLoss(reduction="none")
+        with torch.no_grad():
+            prefix = torch.tensor([encodings[0][:shared]], device=self._device)
+            with self._autocast():
+                outputs = self._model(input_ids=prefix, use_cache=True)
+            past, logits = outputs.past_key_values, outputs.logits.float()
+            last = logits[:, -1:, :]
+            prefix_logp = -lossfn(logits[0, :-1, :], prefix[0, 1:]).sum()
+            for bucket in self._buckets([ids[shared:] for ids in encodings]):
+                inputs = self._tokenizer.pad(
+                    {"input_ids": [encodings[idx][shared:] for idx in bucket]},
+                    return_tensors="pt",
+                ).to(self._device)
+                tokens, mask = inputs["input_ids"], inputs["attention_mask"]
+                with self._autocast():
+                    outputs = self._model(
+                        input_ids=tokens,
+                        attention_mask=torch.cat(
+                            (torch.ones_like(prefix).expand(tokens.size(0), -1), mask),
+                            dim=1,
+                        ),
+                        past_key_values=self._expand_past(past, tokens.size(0)),
+                    )
+                logits = torch.cat(
+                    (
+                        last.expand(tokens.size(0), -1, -1),
+                        outputs.logits[:, :-1, :].float(),
+                    ),
+                    dim=1,
+                )
+                loss = lossfn(
+                    logits.reshape(-1, logits.size(-1)), tokens.view(-1)
+                ).view(tokens.size(0), tokens.size(-1))
+                loss = (loss * mask).sum(dim=1)
+                logp = (prefix_logp - loss).cpu().detach().numpy().astype(np.float64)
+                yield bucket, logp
+
+    def _cached(
+        self,
+        method: str,
+        sents: typing.Sequence[str],
+        compute: typing.Callable[[typing.List[str]], typing.Dict[str, npt.NDArray]],
+    ) -> typing.List[npt.NDArray]:
+        values = self._cache.lookup(method, sents)
+        pending = [sent for sent in dict.fromkeys(sents) if sent not in values]
+        if pending:
+            computed = compute(pending)
+            self._cache.update(method, computed)
+            values.update(computed)
+        return [values[sent] for sent in sents]
+
+    def _score_pending(
+        self, pending: typing.List[str]
+    ) -> typing.Dict[str, npt.NDArray]:
+        computed = {}
+        encodings = self._tokenizer(pending)["input_ids"]
+        for bucket in self._buckets(encodings):
+            logp = self._logp([encodings[idx] for idx in bucket])
+            for idx, value in zip(bucket, logp):
+                computed[pending[idx]] = np.array([value], dtype=np.float64)
+        return computed
+
+    def _score_continuations_pending(
+        self, pending: typing.List[str]
+    ) -> typing.Dict[str, npt.NDArray]:
+        encodings = self._tokenizer(pending)["input_ids"]
+        shared = self._shared_prefix(encodings) if self.supports_prefix_cache else 0
+        if not shared > 0:
+            return self._score_pending(pending)
+        computed = {}
+        for bucket, logp in self._logp_continuations(encodings, shared):
+            for idx, value in zip(bucket, logp):
+                computed[pending[idx]] = np.array([value], dtype=np.float64)
+        return computed
+
+    def _score_pairs_pending(
+        self, pending: typing.List[str]
+    ) -> typing.Dict[str, npt.NDArray]:
+        pairs = [key.split("\0", 1) for key in pending]
+        sents = list(dict.fromkeys(sent for pair in pairs for sent in pair))
+        ids = dict(zip(sents, self.encode(sents)))
+        encodings = [
+            self._special_ids + ids[sent1] + self._separator_ids + ids[sent2]
+            for sent1, sent2 in pairs
+        ]
+        shared = 0
+        if self.supports_prefix_cache and len({sent1 for sent1, _ in pairs}) == 1:
+            shared = min(
+                len(self._special_ids) + len(ids[pairs[0][0]]),
+                min(len(ids) for ids in encodings) - 1,
+            )
+        if shared > 0:
+            results = self._logp_continuations(encodings, shared)
+        else:
+            results = (
+                (bucket, self._logp([encodings[idx] for idx in bucket]))
+                for bucket in self._buckets(encodings)
+            )
+        computed = {}
+        for bucket, logp in results:
+            for idx, value in zip(bucket, logp):
+                computed[pending[idx]] = np.array([value], dtype=np.float64)
+        return computed
+
+    def _embed_pending(
+        self, pending: typing.List[str]
+    ) -> typing.Dict[str, npt.NDArray]:
+        computed = {}
+        encodings = self._tokenizer(pending)["input_ids"]
+        for bucket in self._buckets(encodings):
+            embedding = self._hidden([encodings[idx] for idx in bucket])
+            for idx, value in zip(bucket, embedding):
+                computed[pending[idx]] = value
+        return computed
+
+    def score(self, sent: str) -> float:
+        if not isinstance(sent, str):
+            raise TypeError("sent must be type `str` to get scored.")
+        return float(self.score_batch([sent])[0])
+
+    def score_batch(self, sents: typing.Sequence[str]) -> npt.NDArray[np.float64]:
+        if isinstance(sents, str) or not all(isinstance(sent, str) for sent in sents):
+            raise TypeError("sents must be a sequence of type `str` to get scored.")
+        values = self._cached("score", sents, self._score_pending)
+        return np.array([value[0] for value in values], dtype=np.float64)
+
+    def score_continuations(
+        self, prefix: str, sents: typing.Sequence[str]
+    ) -> npt.NDArray[np.float64]:
+        if not isinstance(prefix, str):
+            raise TypeError("prefix must be type `str` to get scored.")
+        if isinstance(sents, str) or not all(isinstance(sent, str) for sent in sents):
+            raise TypeError("sents must be a sequence of type `str` to get scored.")
+        joints = [prefix + sent for sent in sents]
+        values = self._cached("score", joints, self._score_continuations_pending)
+        return np.array([value[0] for value in values], dtype=np.float64)
+
+    def _hidden(
+        self, encodings: typing.List[typing.List[int]]
+    ) -> npt.NDArray[np.float32]:
+        with torch.no_grad():
+            inputs = self._tokenizer.pad(
+                {"input_ids": encodings}, return_tensors="pt"
+            ).to(self._device)
+            with self._autocast():
+                outputs = self._model(**inputs, output_hidden_states=True)
+            hidden = outputs.hidden_states[-1].float()
+            mask = inputs["attention_mask"].unsqueeze(-1).to(hidden)
+            embedding = (hidden * mask).sum(dim=1) / mask.sum(dim=1)
+        return embedding.cpu().detach().numpy().astype(np.float32)
 
-    @functools.cache
     def embed(self, sent: str) -> npt.NDArray[np.float32]:
         if not isinstance(sent, str):
             raise TypeError("sent must be type `str` to get embed.")
-        with torch.no_grad():
-            inputs = self._tokenizer(sent, return_tensors="pt").to(self._device)
-            outputs = self._model(**inputs, output_hidden_states=True)
-            embedding = outputs.hidden_states[-1].mean(axis=1).cpu().detach().numpy()
-        return embedding
+        return self.embed_batch([sent])
+
+    def embed_batch(self, sents: typing.Sequence[str]) -> npt.NDArray[np.float32]:
+        if isinstance(sents, str) or not all(isinstance(sent, str) for sent in sents):
+            raise TypeError("sents must be a sequence of type `str` to get embed.")
+        return np.stack(self._cached("embed", sents, self._embed_pending))
+
+    def encode(self, sents: typing.Sequence[str]) -> typing.List[typing.List[int]]:
+        if isinstance(sents, str) or not all(isinstance(sent, str) for sent in sents):
+            raise TypeError("sents must be a sequence of type `str` to get encoded.")
+        missing = [sent for sent in dict.fromkeys(sents) if sent not in self._encodings]
+        if missing:
+            encodings = self._tokenizer(missing, add_special_tokens=False)["input_ids"]
+            self._encodings.update(zip(missing, encodings))
+        return [self._encodings[sent] for sent in sents]
+
+    def score_pairs(
+        self, prefix: str, sents: typing.Sequence[str]
+    ) -> npt.NDArray[np.float64]:
+        if not isinstance(prefix, str):
+            raise TypeError("prefix must be type `str` to get scored.")
+        if isinstance(sents, str) or not all(isinstance(sent, str) for sent in sents):
+            raise TypeError("sents must be a sequence of type `str` to get scored.")
+        keys = [f"{prefix}\0{sent}" for sent in sents]
+        method = "pair" if self._separator is None else f"pair{self._separator_ids}"
+        values = self._cached(method, keys, self._score_pairs_pending)
+        return np.array([value[0] for value in values], dtype=np.float64)
+
+
+class CompiledModel(Model):
+    def __init__(
+        self,
+        model_id: str,
+        batchsize: int = 16,
+        cachedir: typing.Optional[pathlib.Path] = None,
+        cachesize: int = 65536,
+        separator: typing.Optional[str] = None,
+        precision: str = "fp32",
+        lengths: typing.Sequence[int] = (16, 32, 64, 128),
+        backend: str = "inductor",
+        calibrate: bool = False,
+    ) -> None:
+        if isinstance(lengths, str) or not all(
+            isinstance(length, int) for length in lengths
+        ):
+            raise TypeError("lengths must be a sequence of type `int`.")
+        if not (len(lengths) > 0 and all(length > 1 for length in lengths)):
+            raise ValueError("lengths must be non-empty and >1.")
+        if not isinstance(backend, str):
+            raise TypeError("backend must be type `str`.")
+        self._compiled: typing.Optional[typing.Callable] = None
+        super().__init__(
+            model_id, batchsize, cachedir, cachesize, separator, precision, calibrate
+        )
+        self._lengths = tuple(sorted(set(lengths)))
+        self._backend = backend
+        try:
+            compiled = torch.compile(self._model, backend=backend, dynamic=False)
+            for length in self._lengths:
+                self._forward(compiled, [[0] * length])
+        except Exception as failure:  # pylint: disable=broad-except
+            self.warn(f"Compiling {self._id} failed ({failure!r}), using eager model.")
+        else:
+            self._compiled = compiled
+            self.info(f"Compiled {self._id} for lengths {self._lengths}.")
+
+    def __reduce__(self) -> typing.Tuple[typing.Callable, typing.Tuple]:
+        return (
+            self.__class__,
+            (
+                self._id,
+                self._batchsize,
+                self._cache.cachedir,
+                self._cache.capacity,
+                self._separator,
+                self._precision,
+                self._lengths,
+                self._backend,
+                False,
+            ),
+        )
+
+    @property
+    def compiled(self) -> bool:
+        return self._compiled is not None
+
+    @property
+    def supports_prefix_cache(self) -> bool:
+        return False
+
+    def _forward(
+        self, compiled: typing.Callable, encodings: typing.List[typing.List[int]]
+    ) -> npt.NDArray[np.float64]:
+        length = next(l for l in self._lengths if l >= max(map(len, encodings)))
+        tokens = torch.full(
+            (self._batchsize, length), self._tokenizer.pad_token_id, dtype=torch.long
+        )
+        mask = torch.zeros((self._batchsize, length), dtype=torch.long)
+        for idx, ids in enumerate(encodings):
+            tokens[idx, : len(ids)] = torch.tensor(ids, dtype=torch.long)
+            mask[idx, : len(ids)] = 1
+        tokens, mask = tokens.to(self._device), mask.to(self._device)
+        with torch.no_grad(), self._autocast():
+            logits = compiled(input_ids=tokens, attention_mask=mask).logits.float()
+        size = len(encodings)
+        return self._sequence_logp(logits[:size], tokens[:size], mask[:size])
+
+    def _logp(
+        self, encodings: typing.List[typing.List[int]]
+    ) -> npt.NDArray[np.float64]:
+        if (
+            self._compiled is None
+            or len(encodings) > self._batchsize
+            or max(map(len, encodings)) > self._lengths[-1]
+        ):
+            return super()._logp(encodings)
+        try:
+            return self._forward(self._compiled, encodings)
+        except Exception as failure:  # pylint: disable=broad-except
+            self.warn(f"Compiled forward failed ({failure!r}), using eager model.")
+            self._compiled = None
+            return super()._logp(encodings)
@@ -1,6 +1,7 @@
 import typing
 
 import numpy as np
+import numpy.typing as npt
 
 from optsent.abstract import Object, IModel
 
@@ -19,6 +20,10 @@ class Objective(Object):
             ) from invalid_objective
         self.info(f"Defined {self._objective._name[1:]} objective.")
 
+    @property
+    def vectorized(self) -> bool:
+        return self._objective.vectorized
+
     @classmethod
     def supported_functions(cls) -> typing.Dict[str, typing.Callable]:
         return {
@@ -34,18 +39,82 @@ class Objective(Object):
             raise TypeError("arguments must adhere to interface to get evaluated.")
         return self._objective(sent1, sent2, model)
 
+    def evaluate_block(
+        self,
+        sents1: typing.Sequence[str],
+        sents2: typing.Sequence[str],
+        model: IModel,
+    ) -> npt.NDArray[np.float64]:
+        if not isinstance(model, IModel) or not all(
+            not isinstance(sents, str) and all(isinstance(s, str) for s in sents)
+            for sents in (sents1, sents2)
+        ):
+            raise TypeError("arguments must adhere to interface to get evaluated.")
+        return self._objective.block(list(sents1), list(sents2), model)
+
+
+def _score_batch(model: IModel, sents: typing.List[str]) -> npt.NDArray[np.float64]:
+    if hasattr(model, "score_batch"):
+        return model.score_batch(sents)
+    return np.array([model.score(sent) for sent in sents], dtype=np.float64)
+
+
+def _embed_batch(model: IModel, sents: typing.List[str]) -> npt.NDArray[np.float32]:
+    if hasattr(model, "embed_batch"):
+        embedding = model.embed_batch(sents)
+    else:
+        embedding = np.concatenate([model.embed(sent) for sent in sents])
+    return embedding.astype(np.float32).reshape(len(sents), -1)
+
 
 class _NormJointLogProb(Object):
+    vectorized = False
+
     @staticmethod
     def __call__(sent1: str, sent2: str, model: IModel) -> float:
-        return model.score(sent1 + sent2) - (model.score(sent1) + model.score(sent2))
+        if hasattr(model, "score_pairs"):
+            joint = model.score_pairs(sent1, [sent2])[0]
+        else:
+            joint = model.score(sent1 + sent2)
+        return joint - (model.score(sent1) + model.score(sent2))
+
+    @staticmethod
+    def block(
+        sents1: typing.List[str], sents2: typing.List[str], model: IModel
+    ) -> npt.NDArray[np.float64]:
+        if hasattr(model, "score_pairs"):
+            joint = np.stack([model.score_pairs(sent1, sents2) for sent1 in sents1])
+        elif hasattr(model, "score_continuations"):
+            joint = np.stack(
+                [model.score_continuations(sent1, sents2) for sent1 in sents1]
+            )
+        else:
+            pairs = [sent1 + sent2 for sent1 in sents1 for sent2 in sents2]
+            joint = _score_batch(model, pairs).reshape(len(sents1), len(sents2))
+        marginal1 = _score_batch(model, sents1)[:, np.newaxis]
+        marginal2 = _score_batch(model, sents2)[np.newaxis, :]
+        return joint - (marginal1 + marginal2)
 
 
 class _EmbeddingSimilarity(Object):
+    vectorized = True
+
     @staticmethod
     def __call__(sent1: str, sent2: str, model: IModel) -> float:
-        emb1, emb2 = model.embed(sent1), model.embed(sent2)
-        cos_sim = (emb1 @ emb2.T).item() / (np.linalg.norm(emb1) * np.linalg.norm(emb2))
-        if np.abs(cos_sim) == 1.0:
-            return np.sign(cos_sim) * np.Inf
-        return np.arctanh(cos_sim)
+        return _EmbeddingSimilarity.block([sent1], [sent2], model).item()
+
+    @staticmethod
+    def block(
+        sents1: typing.List[str], sents2: typing.List[str], model: IModel
+    ) -> npt.NDArray[np.float64]:
+        def normalize(emb: npt.NDArray[np.float32]) -> npt.NDArray[np.float32]:
+            return emb / np.linalg.norm(emb, axis=1, keepdims=True)
+
+        cos_sim = normalize(_embed_batch(model, sents1)) @ normalize(
+            _embed_batch(model, sents2)
+        ).T
+        saturated = np.abs(cos_sim) >= 1.0 - np.finfo(np.float32).eps
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = np.arctanh(cos_sim.astype(np.float64))
+        values[saturated] = np.sign(cos_sim[saturated]) * np.inf
+        return values
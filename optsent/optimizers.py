@@ -1,14 +1,16 @@
 import abc
-import re
+import itertools
+import time
 import typing
 
+import joblib
 import numpy as np
 import numpy.typing as npt
-import pandas as pd
 import tqdm
 
 from optsent.abstract import Object
-from optsent.data import SentenceCollection
+from optsent.constraints import Constraint
+from optsent.data import Graph, SentenceCollection
 
 
 class Optimizer(Object):
@@ -19,23 +21,81 @@ class Optimizer(Object):
         cutoff: float,
         seqlen: int,
         maximize: bool,
+        restarts: int = 1,
+        ncores: int = 1,
+        beamwidth: int = 8,
+        seed: typing.Optional[int] = None,
+        chains: int = 1,
+        nlists: int = 1,
+        maxexact: int = 16,
+        cooling: float = 0.9995,
+        timebudget: float = 60.0,
+        maxiter: int = -1,
     ):
         super().__init__()
         if not all(
             isinstance(arg, type)
             for arg, type in zip(
-                (optimizer, constraint, cutoff, seqlen, maximize),
-                (str, str, (int,float), int, bool),
+                (
+                    optimizer,
+                    constraint,
+                    cutoff,
+                    seqlen,
+                    maximize,
+                    restarts,
+                    ncores,
+                    beamwidth,
+                    seed,
+                    chains,
+                    nlists,
+                    maxexact,
+                    cooling,
+                    timebudget,
+                    maxiter,
+                ),
+                (
+                    str,
+                    str,
+                    (int,float),
+                    int,
+                    bool,
+                    int,
+                    int,
+                    int,
+                    (type(None), int),
+                    int,
+                    int,
+                    int,
+                    (int,float),
+                    (int,float),
+                    int,
+                ),
             )
         ):
             raise TypeError("arguments must adhere to interface.")
         self._id = optimizer
+        self._seqlen = seqlen
+        self._nlists = nlists
         self._indices: typing.List[np.int64] = []
+        self._lists: typing.List[int] = []
         self._values: typing.List[float] = []
-        satisfied: typing.Callable = self._build_constraint(constraint)
+        self._paths: typing.List[typing.Tuple[typing.List, typing.List]] = []
+        allowed: typing.Callable = Constraint(constraint)
         try:
             self._optimizer = self.supported_optimizers()[self._id](
-                maximize, seqlen, satisfied, cutoff
+                maximize,
+                seqlen,
+                allowed,
+                cutoff,
+                restarts,
+                ncores,
+                beamwidth,
+                seed,
+                chains,
+                maxexact,
+                cooling,
+                timebudget,
+                maxiter,
             )
         except KeyError as invalid_optimizer:
             raise ValueError(
@@ -51,132 +111,598 @@ class Optimizer(Object):
     def values(self) -> typing.List[float]:
         return self._values
 
+    @property
+    def lists(self) -> typing.List[int]:
+        return self._lists
+
+    @property
+    def paths(self) -> typing.List[typing.Tuple[typing.List, typing.List]]:
+        return self._paths
+
     @classmethod
     def supported_optimizers(cls) -> typing.Dict[str, typing.Callable]:
-        return {"greedy": _Greedy, "sampling": _Sampling}
+        return {
+            "greedy": _Greedy,
+            "sampling": _Sampling,
+            "greedy+ls": _GreedyLocalSearch,
+            "heldkarp": _HeldKarp,
+            "beam": _BeamSearch,
+            "annealing": _Annealing,
+        }
 
     @classmethod
     def supported_constraints(cls) -> typing.Set[str]:
-        return {"none", "repeats"}
-
-    @staticmethod
-    def _build_constraint(constraint) -> typing.Callable:
-        if constraint == "none":
-
-            def satisfied(text: pd.Series, vertex: int, target: int) -> bool:
-                return True
-
-        elif constraint == "repeats":
-
-            def satisfied(text: pd.Series, vertex: int, target: int) -> bool:
-                def tokenize(string: str) -> typing.List[str]:
-                    return re.sub(r"[^A-Za-z0-9 ]+", "", string).lower().split()
-
-                return tokenize(text[vertex])[-1] != tokenize(text[target])[0]
-
-        else:
-            raise ValueError("Unsupported constraint.")
-        return satisfied
+        return set(Constraint.supported_constraints())
 
     def solve(self, sents: SentenceCollection) -> None:
         if not isinstance(sents, SentenceCollection):
             raise TypeError("Optimizer can only solve `SentenceCollection` objects.")
-        self._indices, self._values = self._optimizer(sents)
+        length = None
+        if self._nlists > 1:
+            length = self._seqlen if self._seqlen > 0 else sents.size // self._nlists
+            if not (length > 1 and length * self._nlists <= sents.size):
+                raise ValueError("nlists lists of seqlen must fit in the inputs.")
+            self.info(f"Solving {self._nlists} disjoint lists of {length} strings.")
+        available = np.ones(sents.size, dtype=bool)
+        self._indices, self._values, self._lists, paths = [], [], [], []
+        for list_id in range(self._nlists):
+            indices, values = self._optimizer(sents, available, length)
+            available[indices] = False
+            self._indices += indices
+            self._values += values
+            self._lists += [list_id] * len(indices)
+            paths.append((indices, values))
+        if self._nlists == 1 and self._optimizer.paths:
+            paths = self._optimizer.paths
+        self._paths = paths
 
 
 class _LinearATSP(Object):
     def __init__(
-        self, maximize: bool, seqlen: int, satisfied: typing.Callable, cutoff: float
+        self,
+        maximize: bool,
+        seqlen: int,
+        allowed: typing.Callable,
+        cutoff: float,
+        restarts: int = 1,
+        ncores: int = 1,
+        beamwidth: int = 8,
+        seed: typing.Optional[int] = None,
+        chains: int = 1,
+        maxexact: int = 16,
+        cooling: float = 0.9995,
+        timebudget: float = 60.0,
+        maxiter: int = -1,
     ):
         super().__init__()
         self._opt = np.max if maximize else np.min
         self._argopt = np.argmax if maximize else np.argmin
         self._sign = -1 if maximize else 1
         self._null = self._sign * np.inf
+        self._length = seqlen
         self._seqlen = seqlen
-        self._satisfied = satisfied
+        self._constraint = allowed
+        self._constrained: typing.Optional[SentenceCollection] = None
+        self._allowed: npt.NDArray[np.bool_] = np.ones((0, 0), dtype=bool)
+        self._available: npt.NDArray[np.bool_] = np.ones(0, dtype=bool)
         self._cutoff = cutoff
+        self._restarts = restarts
+        self._ncores = ncores
+        self._beamwidth = beamwidth
+        self._chains = chains
+        self._maxexact = maxexact
+        self._cooling = cooling
+        self._timebudget = timebudget
+        self._maxiter = maxiter
+        self._rng = np.random.default_rng(seed)
+        self._paths: typing.List[typing.Tuple[typing.List, typing.List]] = []
 
-    def _update_seqlen(self, sents: SentenceCollection) -> None:
-        if self._seqlen > sents.size:
-            self._seqlen = sents.size
-        elif self._seqlen <= 0:
-            self._seqlen = sents.size
+    @property
+    def paths(self) -> typing.List[typing.Tuple[typing.List, typing.List]]:
+        return self._paths
+
+    def _update_seqlen(self, count: int, length: typing.Optional[int]) -> None:
+        length = self._length if length is None else length
+        if length > count:
+            self._seqlen = count
+        elif length <= 0:
+            self._seqlen = count
         else:
-            pass
+            self._seqlen = length
+
+    def _prepare(
+        self,
+        sents: SentenceCollection,
+        available: typing.Optional[npt.NDArray[np.bool_]],
+        length: typing.Optional[int],
+    ) -> None:
+        if sents.graph.is_empty():
+            raise RuntimeError("SentenceCollection graph is empty.")
+        if available is None:
+            available = np.ones(sents.size, dtype=bool)
+        self._available = available
+        self._update_seqlen(int(available.sum()), length)
+        if self._constrained is not sents:
+            self._allowed = self._constraint(sents)
+            self._constrained = sents
+
+    def _start_extremum(self, graph: Graph) -> npt.NDArray[np.floating]:
+        extremum = graph.column_extremum(self._sign < 0)
+        extremum[np.isnan(extremum) | ~self._available] = self._null
+        return extremum
 
     @abc.abstractmethod
     def _select_optimal_target(
-        self, matrix: npt.NDArray[np.float64], vertex: np.int64
+        self, targets: npt.NDArray[np.floating], vertex: np.int64
     ) -> np.int64:
         raise NotImplementedError()  # pragma: no cover
 
-    def _select_random_target(
-        self, matrix: npt.NDArray[np.float64], vertex: np.int64
-    ) -> np.int64:
-        self.warn(
-            "Stuck at non-optimal transition. Sampling new states until constraints valid."
-        )
-        targets = matrix[vertex, :]
-        mask = targets != self._null
-        options = np.where(mask)[0]
-        return np.random.choice(options)
-
-    def _get_next_vertex(
+    def _get_targets(
         self,
-        matrix: npt.NDArray[np.float64],
+        row: npt.NDArray[np.floating],
+        allowed: npt.NDArray[np.bool_],
         vertex: np.int64,
-        sents: SentenceCollection,
-    ) -> np.int64:
-        target = self._select_optimal_target(matrix, vertex)
-        attempts = 5
-        while not self._satisfied(sents.sentences, vertex, target):
-            if not attempts:
-                self.warn(
-                    f"No valid transitions found. Relaxing constraints from state {vertex}."
-                )
-                break
-            target = self._select_random_target(matrix, vertex)
-            attempts -= 1
-        return target
+    ) -> npt.NDArray[np.floating]:
+        scored = ~np.isnan(row)
+        if not scored.any():
+            self.warn("No scored transitions left. Continuing with unscored states.")
+            row, scored = np.zeros_like(row), np.ones_like(scored)
+        valid = scored & allowed
+        if not valid.any():
+            self.warn(
+                f"No valid transitions found. Relaxing constraints from state {vertex}."
+            )
+            valid = scored
+        return np.where(valid, row, self._null)
 
-    def __call__(
-        self, sents: SentenceCollection
+    def _select_starts(
+        self, extremum: npt.NDArray[np.floating]
+    ) -> npt.NDArray[np.int64]:
+        start = self._argopt(extremum)
+        if not self._available[start]:
+            start = np.nonzero(self._available)[0][0]
+        if self._restarts == 1:
+            return np.array([start])
+        others = np.nonzero(self._available)[0]
+        others = others[others != start]
+        if self._restarts == -1 or self._restarts > others.size:
+            return np.concatenate(([start], others))
+        sampled = self._rng.choice(others, self._restarts - 1, replace=False)
+        return np.concatenate(([start], sampled))
+
+    def _walk(
+        self, sents: SentenceCollection, vertex: np.int64, progress: bool = True
     ) -> typing.Tuple[typing.List[np.int64], typing.List[float]]:
-        if np.all(sents.graph.matrix == 0):
-            raise RuntimeError("SentenceCollection graph is empty.")
-        self._update_seqlen(sents)
-        matrix = sents.graph.matrix.copy()
-        matrix[np.isnan(matrix)] = self._null
-        indices, values = [], []
-        vertex = self._argopt(self._opt(matrix, axis=0))
-        matrix[:, vertex] = self._null
-        indices.append(vertex)
-        values.append(np.nan)
-        for _ in tqdm.trange(self._seqlen - 1):  # type:ignore
-            target = self._get_next_vertex(matrix, vertex, sents)
-            value = matrix[vertex, target]
-            indices.append(target)
-            values.append(value)
-            matrix[:, target] = self._null
-            vertex = target
+        graph = sents.graph
+        remaining = np.nonzero(self._available)[0]
+        remaining = remaining[remaining != vertex]
+        indices, values = [vertex], [np.nan]
+        for _ in tqdm.trange(self._seqlen - 1, disable=not progress):  # type:ignore
+            row = graph.row(int(vertex))[remaining]
+            targets = self._get_targets(row, self._allowed[vertex, remaining], vertex)
+            position = self._select_optimal_target(targets, vertex)
+            indices.append(remaining[position])
+            values.append(row[position])
+            vertex = remaining[position]
+            remaining = np.delete(remaining, position)
         return indices, values
 
+    def _cost_matrix(
+        self, sents: SentenceCollection, vertices: npt.NDArray[np.int64]
+    ) -> typing.Tuple[npt.NDArray[np.floating], npt.NDArray[np.floating]]:
+        weights = np.stack([sents.graph.row(v)[vertices] for v in vertices])
+        allowed = self._allowed[np.ix_(vertices, vertices)]
+        cost = self._sign * weights
+        valid = allowed & ~np.isnan(cost)
+        finite = valid & np.isfinite(cost)
+        bound = np.abs(cost[finite]).max() if finite.any() else 0.0
+        extreme = 1.0 + 2.0 * vertices.size * bound
+        cost = np.clip(np.where(valid, cost, 0.0), -extreme, extreme)
+        cost = np.where(valid, cost, 1.0 + 2.0 * vertices.size * extreme)
+        np.fill_diagonal(cost, np.inf)
+        return weights, cost
+
+    def _penalty(self, graph: Graph) -> float:
+        bounds = np.abs(
+            np.concatenate((graph.column_extremum(True), graph.column_extremum(False)))
+        )
+        bounds = bounds[np.isfinite(bounds)]
+        bound = bounds.max() if bounds.size else 0.0
+        return 1.0 + 2.0 * graph.dim * float(bound)
+
+    def _path_cost(self, path: typing.Tuple[typing.List, typing.List]) -> float:
+        return self._sign * np.nansum(path[1])
+
+    def __call__(
+        self,
+        sents: SentenceCollection,
+        available: typing.Optional[npt.NDArray[np.bool_]] = None,
+        length: typing.Optional[int] = None,
+    ) -> typing.Tuple[typing.List[np.int64], typing.List[float]]:
+        self._prepare(sents, available, length)
+        starts = self._select_starts(self._start_extremum(sents.graph))
+        if starts.size == 1:
+            return self._walk(sents, starts[0])
+        self.info(f"Running {starts.size} restarts.")
+        with joblib.parallel_backend("threading", n_jobs=self._ncores):
+            self._paths = joblib.Parallel()(
+                joblib.delayed(self._walk)(sents, start, False)
+                for start in tqdm.tqdm(starts)
+            )
+        return min(self._paths, key=self._path_cost)
+
 
 class _Greedy(_LinearATSP):
     def _select_optimal_target(
-        self, matrix: npt.NDArray[np.float64], vertex: np.int64
+        self, targets: npt.NDArray[np.floating], vertex: np.int64
     ) -> np.int64:
-        return self._argopt(matrix[vertex, :])
+        return self._argopt(targets)
 
 
 class _Sampling(_LinearATSP):
     def _select_optimal_target(
-        self, matrix: npt.NDArray[np.float64], vertex: np.int64
+        self, targets: npt.NDArray[np.floating], vertex: np.int64
     ) -> np.int64:
-        targets = matrix[vertex, :]
-        mask = self._sign * targets < self._cutoff
-        if not mask.sum() > 0:
-            return self._select_random_target(matrix, vertex)
-        options = np.where(mask)[0]
-        return np.random.choice(options)
+        return self._select_chain_targets(targets[np.newaxis])[0]
+
+    def _select_chain_targets(
+        self, targets: npt.NDArray[np.floating]
+    ) -> npt.NDArray[np.int64]:
+        options = self._sign * targets < self._cutoff
+        stuck = ~options.any(axis=1)
+        if stuck.any():
+            self.warn("No transitions within cutoff. Sampling from valid states.")
+            options[stuck] = targets[stuck] != self._null
+        keys = self._rng.random(targets.shape)
+        return np.argmax(np.where(options, keys, -1.0), axis=1)
+
+    def _get_chain_targets(
+        self,
+        rows: npt.NDArray[np.floating],
+        allowed: npt.NDArray[np.bool_],
+        visited: npt.NDArray[np.bool_],
+    ) -> npt.NDArray[np.floating]:
+        scored = ~np.isnan(rows) & ~visited
+        unscored = ~scored.any(axis=1)
+        if unscored.any():
+            self.warn("No scored transitions left. Continuing with unscored states.")
+            rows = np.where(unscored[:, None], 0.0, rows)
+            scored[unscored] = ~visited[unscored]
+        valid = scored & allowed
+        relaxed = ~valid.any(axis=1)
+        if relaxed.any():
+            self.warn("No valid transitions found. Relaxing constraints.")
+            valid[relaxed] = scored[relaxed]
+        return np.where(valid, rows, self._null)
+
+    def __call__(
+        self,
+        sents: SentenceCollection,
+        available: typing.Optional[npt.NDArray[np.bool_]] = None,
+        length: typing.Optional[int] = None,
+    ) -> typing.Tuple[typing.List[np.int64], typing.List[float]]:
+        graph = sents.graph
+        self._prepare(sents, available, length)
+        starts = self._select_starts(self._start_extremum(graph))
+        last = np.resize(starts, max(self._chains, starts.size))
+        chains = np.arange(last.size)
+        visited = np.tile(~self._available, (last.size, 1))
+        visited[chains, last] = True
+        indices, values = [last], [np.full(last.size, np.nan)]
+        for _ in tqdm.trange(self._seqlen - 1):  # type:ignore
+            rows = graph.rows(last)
+            targets = self._get_chain_targets(rows, self._allowed[last], visited)
+            last = self._select_chain_targets(targets)
+            indices.append(last)
+            values.append(rows[chains, last])
+            visited[chains, last] = True
+        self._paths = [
+            (path.tolist(), [np.nan] + weights[1:].tolist())
+            for path, weights in zip(np.stack(indices, 1), np.stack(values, 1))
+        ]
+        return min(self._paths, key=self._path_cost)
+
+
+class _GreedyLocalSearch(_Greedy):
+    _segment_lengths = (1, 2, 3)
+
+    @staticmethod
+    def _best_segment_move(
+        cost: npt.NDArray[np.floating],
+        order: npt.NDArray[np.int64],
+        start: int,
+        length: int,
+    ) -> typing.Optional[npt.NDArray[np.int64]]:
+        stop = start + length
+        segment = order[start:stop]
+        rest = np.concatenate((order[:start], order[stop:]))
+        if not rest.size:
+            return None
+        head, tail = segment[0], segment[-1]
+        removed = 0.0
+        if start > 0:
+            removed += cost[order[start - 1], head]
+        if stop < order.size:
+            removed += cost[tail, order[stop]]
+        if 0 < start and stop < order.size:
+            removed -= cost[order[start - 1], order[stop]]
+        inserted = np.concatenate(
+            (
+                [cost[tail, rest[0]]],
+                cost[rest[:-1], head]
+                + cost[tail, rest[1:]]
+                - cost[rest[:-1], rest[1:]],
+                [cost[rest[-1], head]],
+            )
+        )
+        delta = inserted - removed
+        delta[start] = 0.0
+        best = np.argmin(delta)
+        if not delta[best] < -1e-9:
+            return None
+        return np.concatenate((rest[:best], segment, rest[best:]))
+
+    def _refine(
+        self, sents: SentenceCollection, path: typing.List[np.int64]
+    ) -> typing.Tuple[typing.List[np.int64], typing.List[float]]:
+        vertices = np.asarray(path)
+        weights, cost = self._cost_matrix(sents, vertices)
+        order = np.arange(vertices.size)
+        deadline = time.monotonic() + self._timebudget
+        moves, improved = 0, True
+        while improved:
+            improved = False
+            for length, start in (
+                (length, start)
+                for length in self._segment_lengths
+                for start in range(vertices.size - length + 1)
+            ):
+                if moves == self._maxiter or time.monotonic() > deadline:
+                    self.warn("Local search budget exhausted.")
+                    improved = False
+                    break
+                moved = self._best_segment_move(cost, order, start, length)
+                if moved is not None:
+                    order, moves, improved = moved, moves + 1, True
+        self.info(f"Local search applied {moves} segment moves.")
+        values = [np.nan] + [weights[u, v] for u, v in zip(order, order[1:])]
+        return vertices[order].tolist(), values
+
+    def __call__(
+        self,
+        sents: SentenceCollection,
+        available: typing.Optional[npt.NDArray[np.bool_]] = None,
+        length: typing.Optional[int] = None,
+    ) -> typing.Tuple[typing.List[np.int64], typing.List[float]]:
+        indices, _ = super().__call__(sents, available, length)
+        return self._refine(sents, indices)
+
+
+class _HeldKarp(_Greedy):
+    def __call__(
+        self,
+        sents: SentenceCollection,
+        available: typing.Optional[npt.NDArray[np.bool_]] = None,
+        length: typing.Optional[int] = None,
+    ) -> typing.Tuple[typing.List[np.int64], typing.List[float]]:
+        self._prepare(sents, available, length)
+        vertices = np.nonzero(self._available)[0]
+        if vertices.size > self._maxexact:
+            self.warn(
+                f"Exact search limited to {self._maxexact} strings. Falling back to greedy."
+            )
+            return super().__call__(sents, available, length)
+        size = vertices.size
+        weights, cost = self._cost_matrix(sents, vertices)
+        masks = np.arange(1 << size)
+        bits = (masks[:, None] >> np.arange(size)) & 1
+        popcount = bits.sum(axis=1)
+        table = np.full((masks.size, size), np.inf)
+        parent = np.full((masks.size, size), -1, dtype=np.min_scalar_type(-size))
+        table[1 << np.arange(size), np.arange(size)] = 0.0
+        for layer in tqdm.trange(2, self._seqlen + 1):  # type:ignore
+            current = masks[popcount == layer]
+            for vertex in range(size):
+                ending = current[bits[current, vertex] == 1]
+                previous = ending ^ (1 << vertex)
+                candidates = table[previous] + cost[:, vertex]
+                candidates[bits[previous] == 0] = np.inf
+                best = np.argmin(candidates, axis=1)
+                table[ending, vertex] = candidates[np.arange(ending.size), best]
+                parent[ending, vertex] = best
+        final = masks[popcount == self._seqlen]
+        row, col = np.unravel_index(np.argmin(table[final]), (final.size, size))
+        mask, vertex = int(final[row]), int(col)
+        indices = [vertex]
+        while parent[mask, vertex] >= 0:
+            mask, vertex = mask ^ (1 << vertex), int(parent[mask, vertex])
+            indices.append(vertex)
+        indices.reverse()
+        values = [np.nan] + [weights[u, v] for u, v in zip(indices, indices[1:])]
+        return vertices[indices].tolist(), values
+
+
+class _BeamSearch(_Greedy):
+    def __call__(
+        self,
+        sents: SentenceCollection,
+        available: typing.Optional[npt.NDArray[np.bool_]] = None,
+        length: typing.Optional[int] = None,
+    ) -> typing.Tuple[typing.List[np.int64], typing.List[float]]:
+        graph = sents.graph
+        self._prepare(sents, available, length)
+        penalty = self._penalty(graph)
+        keys = np.random.default_rng(0).integers(
+            0, np.iinfo(np.int64).max, graph.dim, dtype=np.int64
+        )
+        extremum = self._sign * self._start_extremum(graph)
+        width = self._beamwidth
+        last = np.argsort(extremum, kind="stable")[: min(width, self._available.sum())]
+        paths = last[:, None]
+        costs = np.zeros(last.size)
+        hashes = keys[last]
+        visited = np.tile(~self._available, (last.size, 1))
+        visited[np.arange(last.size), last] = True
+        for _ in tqdm.trange(self._seqlen - 1):  # type:ignore
+            steps = self._sign * graph.rows(last)
+            steps = np.where(np.isnan(steps), penalty, steps)
+            steps = np.where(self._allowed[last], steps, steps + penalty)
+            candidates = costs[:, None] + steps
+            candidates = np.where(visited | np.isnan(candidates), np.inf, candidates)
+            candidates, blocked = candidates.ravel(), visited.ravel()
+            count = min(int((~blocked).sum()), 4 * width)
+            best = np.argpartition(np.where(blocked, np.nan, candidates), count - 1)
+            best = best[:count]
+            best = best[np.argsort(candidates[best], kind="stable")]
+            parents, targets = np.divmod(best, graph.dim)
+            states = np.stack((hashes[parents] ^ keys[targets], targets), axis=1)
+            _, first = np.unique(states, axis=0, return_index=True)
+            keep = np.sort(first)[:width]
+            parents, targets = parents[keep], targets[keep]
+            paths = np.concatenate((paths[parents], targets[:, None]), axis=1)
+            costs = candidates[best[keep]]
+            hashes = hashes[parents] ^ keys[targets]
+            visited = visited[parents]
+            visited[np.arange(targets.size), targets] = True
+            last = targets
+        indices = paths[np.argmin(costs)].tolist()
+        values = [np.nan] + [graph.row(u)[v] for u, v in zip(indices, indices[1:])]
+        return indices, values
+
+
+class _Annealing(_Greedy):
+    _initial_temperature: typing.Optional[float] = None
+    _max_segment = 3
+
+    def _edge_costs(
+        self, graph: Graph, penalty: float, u: npt.NDArray, v: npt.NDArray
+    ) -> npt.NDArray[np.floating]:
+        missing = (u < 0) | (v < 0)
+        u, v = np.where(missing, 0, u), np.where(missing, 0, v)
+        cost = self._sign * graph.weights(u, v)
+        cost = np.where(np.isnan(cost), penalty, cost)
+        cost = np.where(self._allowed[u, v], cost, cost + penalty)
+        return np.where(missing, 0.0, cost)
+
+    def _prefix_costs(
+        self, graph: Graph, penalty: float, path: npt.NDArray[np.int64]
+    ) -> typing.Tuple[npt.NDArray[np.floating], npt.NDArray[np.floating]]:
+        forward = self._edge_costs(graph, penalty, path[:-1], path[1:])
+        backward = self._edge_costs(graph, penalty, path[1:], path[:-1])
+        return (
+            np.concatenate(([0.0], np.cumsum(forward))),
+            np.concatenate(([0.0], np.cumsum(backward))),
+        )
+
+    def _propose(
+        self,
+        graph: Graph,
+        penalty: float,
+        paths: npt.NDArray[np.int64],
+        forward: npt.NDArray[np.floating],
+        backward: npt.NDArray[np.floating],
+    ) -> typing.Tuple[npt.NDArray, ...]:
+        replicas, length = paths.shape
+        chains = np.arange(replicas)
+
+        draws = self._rng.random((6, replicas))
+        reverse = draws[0] < 0.5
+        head = (draws[1] * (length - 1)).astype(np.int64)
+        tail = head + 1 + (draws[2] * (length - 1 - head)).astype(np.int64)
+        size = 1 + (draws[3] * min(self._max_segment, length - 1)).astype(np.int64)
+        start = np.where(
+            reverse, head, (draws[4] * (length - size + 1)).astype(np.int64)
+        )
+        stop = np.where(reverse, tail, start + size - 1)
+        size = stop - start + 1
+        offset = (draws[5] * np.maximum(length - size, 1)).astype(np.int64)
+        insert = np.where(offset < start, offset, offset + size + 1)
+        positions = np.stack((start - 1, stop + 1, start, stop, insert - 1, insert))
+        valid = (positions >= 0) & (positions < length)
+        vertices = paths[chains, np.where(valid, positions, 0)]
+        before, after, first, last, left, right = np.where(valid, vertices, -1)
+        edges = self._edge_costs(
+            graph,
+            penalty,
+            np.concatenate((before, first, before, last, before, left, last, left)),
+            np.concatenate((last, after, first, after, after, first, right, right)),
+        ).reshape(8, replicas)
+        delta_reverse = (
+            edges[0]
+            + edges[1]
+            - edges[2]
+            - edges[3]
+            + backward[chains, stop]
+            - backward[chains, start]
+            - forward[chains, stop]
+            + forward[chains, start]
+        )
+        delta_insert = edges[4] + edges[5] + edges[6] - edges[2] - edges[3] - edges[7]
+        delta = np.where(reverse, delta_reverse, delta_insert)
+        return reverse, start, stop, insert, delta
+
+    @staticmethod
+    def _apply(
+        path: npt.NDArray[np.int64], reverse: bool, start: int, stop: int, insert: int
+    ) -> None:
+        if reverse:
+            path[start : stop + 1] = path[start : stop + 1][::-1].copy()
+            return
+        segment = path[start : stop + 1].copy()
+        rest = np.delete(path, np.arange(start, stop + 1))
+        position = insert if insert < start else insert - segment.size
+        path[:] = np.insert(rest, position, segment)
+
+    def __call__(
+        self,
+        sents: SentenceCollection,
+        available: typing.Optional[npt.NDArray[np.bool_]] = None,
+        length: typing.Optional[int] = None,
+    ) -> typing.Tuple[typing.List[np.int64], typing.List[float]]:
+        indices, values = super().__call__(sents, available, length)
+        if len(indices) < 3:
+            return indices, values
+        graph = sents.graph
+        penalty = self._penalty(graph)
+        paths = np.tile(np.asarray(indices), (self._chains, 1))
+        forward, backward = map(
+            np.stack, zip(*(self._prefix_costs(graph, penalty, p) for p in paths))
+        )
+        costs = forward[:, -1].copy()
+        best_paths, best_costs = paths.copy(), costs.copy()
+        temperature = self._initial_temperature
+        if temperature is None:
+            delta = self._propose(graph, penalty, paths, forward, backward)[-1]
+            delta = np.abs(delta[np.abs(delta) < penalty])
+            temperature = float(np.median(delta)) if delta.size else 1.0
+        frozen = temperature * 1e-6
+        deadline = time.monotonic() + self._timebudget
+        steps = itertools.count() if self._maxiter == -1 else range(self._maxiter)
+        for step in tqdm.tqdm(steps):
+            if not step % 256 and time.monotonic() > deadline:
+                self.warn("Annealing time budget exhausted.")
+                break
+            reverse, start, stop, insert, delta = self._propose(
+                graph, penalty, paths, forward, backward
+            )
+            threshold = np.exp(-np.maximum(delta, 0.0) / max(temperature, 1e-12))
+            for chain in np.nonzero(self._rng.random(delta.size) < threshold)[0]:
+                self._apply(
+                    paths[chain],
+                    reverse[chain],
+                    start[chain],
+                    stop[chain],
+                    insert[chain],
+                )
+                forward[chain], backward[chain] = self._prefix_costs(
+                    graph, penalty, paths[chain]
+                )
+                costs[chain] = forward[chain, -1]
+                if costs[chain] < best_costs[chain]:
+                    best_paths[chain], best_costs[chain] = paths[chain], costs[chain]
+            temperature *= self._cooling
+            if temperature < frozen:
+                break
+        path = best_paths[np.argmin(best_costs)]
+        weights = graph.weights(path[:-1], path[1:])
+        return path.tolist(), [np.nan] + weights.tolist()
@@ -1,17 +1,20 @@
-import itertools
+import json
 import pathlib
 import typing
 
-import joblib
 import numpy as np
 import pandas as pd
-import tqdm
 
 from optsent.abstract import Object, IModel, IObjective, IOptimizer
 from optsent.args import ArgTool
+from optsent.builder import GraphBuilder
+from optsent.data import Graph, SparseGraph
+from optsent.optimizers import Optimizer
 
 
 class OptSent(Object):
+    _csv_max_dim = 1000
+
     def __init__(
         self,
         inputs: str | pathlib.Path | typing.Collection[str],
@@ -22,8 +25,32 @@ class OptSent(Object):
         constraint: str = "none",
         cutoff: float = 0.0,
         seqlen: int = -1,
+        nlists: int = 1,
         maximize: bool = False,
+        restarts: int = 1,
+        beamwidth: int = 8,
+        seed: typing.Optional[int] = None,
+        chains: int = 1,
+        maxexact: int = 16,
+        cooling: float = 0.9995,
+        timebudget: float = 60.0,
+        maxiter: int = -1,
         ncores: int = 1,
+        batchsize: int = 16,
+        blocksize: int = -1,
+        backend: str = "thread",
+        cache: bool = False,
+        cachedir: typing.Optional[str | pathlib.Path] = None,
+        cachesize: int = 65536,
+        separator: typing.Optional[str] = None,
+        precision: str = "fp32",
+        reuse_graph: bool = True,
+        graphfmt: str = "auto",
+        dtype: str = "float64",
+        topk: int = -1,
+        prune: int = -1,
+        lazy: bool = False,
+        basegraph: typing.Optional[str | pathlib.Path] = None,
         export: bool = True,
     ) -> None:
         # pylint: disable=unused-argument
@@ -31,36 +58,45 @@ class OptSent(Object):
         kwargs = {k: v for k, v in locals().items() if k not in ["self", "__class__"]}
         argtool = ArgTool()
         argtool.log_args(kwargs)
-        self._unique_id = argtool.get_unique_id(kwargs)
         for arg, value in kwargs.items():
+            if arg == "model":
+                continue
             argprep = getattr(argtool, f"prep_{arg}")
             setattr(self, f"_{arg}", argprep(value))
+        if self._lazy and self._topk > 0:
+            raise ValueError("lazy graphs cannot be combined with topk.")
+        if self._lazy and self._prune > 0:
+            raise ValueError("lazy graphs cannot be combined with prune.")
+        self._inputs.graph = argtool.build_graph(self._inputs, kwargs)
+        self._model = argtool.build_model(kwargs)
+        precision = getattr(self._model, "precision", "fp32")
+        graph_kwargs = {**kwargs, "precision": precision}
+        self._graph_id = argtool.get_graph_id(self._inputs, graph_kwargs)
+        self._graph_meta = argtool.get_graph_meta(graph_kwargs)
+        self._unique_id = argtool.get_unique_id(self._graph_id, kwargs)
         self._optimizer = argtool.build_optimizer(kwargs)
+        self._builder = GraphBuilder(
+            self._objective,
+            self._model,
+            self._backend,
+            self._blocksize,
+            self._ncores,
+            self._prune,
+        )
 
     @property
     def unique_id(self):
         return self._unique_id
 
+    @property
+    def graph_id(self):
+        return self._graph_id
+
     def _build_graph(self) -> None:
-        # refactor: loop O(n), compare each sent with batch of n sents, fill in whole column at once
         self.info("Building transition graph.")
-        dim = self._inputs.size
-        indices = tqdm.tqdm(
-            itertools.product(range(dim), range(dim)), total=dim**2
-        )  # type:ignore
-
-        def write_weight(self, i, j):
-            if i == j:
-                value = np.nan
-            else:
-                sent1, sent2 = self._inputs.sentences[i], self._inputs.sentences[j]
-                value = self._objective.evaluate(sent1, sent2, self._model)
-            self._inputs.graph.write_transition_weight(i, j, value)
-
-        with joblib.parallel_backend("threading", n_jobs=self._ncores):
-            joblib.Parallel()(
-                joblib.delayed(write_weight)(self, i, j) for i, j in indices
-            )
+        self._builder.build(self._inputs)
+        if hasattr(self._model, "cache"):
+            self._model.cache.log_stats()
 
     def _solve_optim(self) -> None:
         self.info("Solving sequence optimization.")
@@ -69,6 +105,8 @@ class OptSent(Object):
     def _make_output_table(self) -> pd.DataFrame:
         table = pd.DataFrame(self._inputs.sentences[self._optimizer.indices])
         table["TransitionObjective"] = self._optimizer.values
+        if isinstance(self._optimizer, Optimizer) and self._nlists > 1:
+            table["ListID"] = self._optimizer.lists
         return table
 
     def _save_input(self) -> None:
@@ -78,16 +116,104 @@ class OptSent(Object):
             table = self._inputs.sentences
             table.to_csv(fname, index_label="SentenceID")
 
+    def _graph_dir(self) -> pathlib.Path:
+        return self._outdir / "graphs" / self.graph_id
+
+    def _graph_format(self) -> str:
+        if self._graphfmt != "auto":
+            return self._graphfmt
+        return "csv" if self._inputs.size <= self._csv_max_dim else "npy"
+
+    @staticmethod
+    def _read_graph(
+        dirname: pathlib.Path,
+    ) -> typing.Optional[typing.Tuple[typing.Dict[str, typing.Any], Graph]]:
+        sidecar = dirname / "GRAPH.json"
+        meta = json.loads(sidecar.read_text()) if sidecar.is_file() else {}
+        if (dirname / "GRAPH.npz").is_file():
+            arrays = np.load(dirname / "GRAPH.npz")
+            graph = SparseGraph.from_arrays(
+                arrays["indices"], arrays["values"], meta.get("maximize", False)
+            )
+            return meta, graph
+        if (dirname / "GRAPH.npy").is_file():
+            return meta, Graph.from_matrix(
+                np.load(dirname / "GRAPH.npy", mmap_mode="r")
+            )
+        if (dirname / "GRAPH.csv").is_file():
+            table = pd.read_csv(dirname / "GRAPH.csv", index_col="SentenceID")
+            return meta, Graph.from_matrix(table.values)
+        return None
+
+    def _load_graph(self) -> bool:
+        if not self._reuse_graph:
+            return False
+        cached = self._read_graph(self._graph_dir())
+        if cached is None:
+            return False
+        self.info("Loading cached transition graph.")
+        meta, graph = cached
+        sentence_ids = self._inputs.sentences.index.tolist()
+        if meta.get("sentence_ids", sentence_ids) != sentence_ids:
+            raise RuntimeError(f"cached graph ({self.graph_id}) does not match inputs.")
+        dtype = self._inputs.graph.dtype
+        if isinstance(graph, SparseGraph) and graph.dtype != dtype:
+            graph = SparseGraph.from_arrays(
+                graph.indices, graph.values.astype(dtype), graph.maximize
+            )
+        elif graph.dtype != dtype:
+            graph = Graph.from_matrix(graph.matrix.astype(dtype))
+        self._inputs.graph = graph
+        return True
+
+    def _update_graph(self) -> bool:
+        if self._basegraph is None:
+            return False
+        cached = self._read_graph(self._basegraph)
+        if cached is None or "sentences" not in cached[0]:
+            raise FileNotFoundError(
+                f"basegraph ({self._basegraph}) must contain a graph and GRAPH.json."
+            )
+        meta, graph = cached
+        if {k: meta.get(k) for k in self._graph_meta} != self._graph_meta:
+            raise ValueError(
+                f"basegraph must share {', '.join(self._graph_meta)} with this run."
+            )
+        self.info("Updating transition graph from base graph.")
+        self._builder.update(self._inputs, meta["sentences"], graph.matrix)
+        if hasattr(self._model, "cache"):
+            self._model.cache.log_stats()
+        return True
+
     def _save_graph(self) -> None:
         if self._export:
             self.info("Caching transition graph.")
-            fname = self._outdir / self.unique_id / "GRAPH.csv"
-            table = pd.DataFrame(
-                data=self._inputs.graph.matrix,
-                index=self._inputs.sentences.index,
-                columns=self._inputs.sentences.index,
-            )
-            table.to_csv(fname, index_label="SentenceID")
+            graphfmt = self._graph_format()
+            dirname = self._graph_dir()
+            dirname.mkdir(parents=True, exist_ok=True)
+            graph = self._inputs.graph
+            if isinstance(graph, SparseGraph):
+                np.savez(
+                    dirname / "GRAPH.npz", indices=graph.indices, values=graph.values
+                )
+            elif graphfmt == "npy":
+                np.save(dirname / "GRAPH.npy", graph.matrix)
+            else:
+                table = pd.DataFrame(
+                    data=self._inputs.graph.matrix,
+                    index=self._inputs.sentences.index,
+                    columns=self._inputs.sentences.index,
+                )
+                table.to_csv(dirname / "GRAPH.csv", index_label="SentenceID")
+            meta = {
+                "graph_id": self.graph_id,
+                **self._graph_meta,
+                "dim": self._inputs.graph.dim,
+                "dtype": self._inputs.graph.dtype.str,
+                "sentence_ids": self._inputs.sentences.index.tolist(),
+                "sentences": self._inputs.sentences.tolist(),
+            }
+            (dirname / "GRAPH.json").write_text(json.dumps(meta))
 
     def _save_optim(self) -> None:
         if self._export:
@@ -100,8 +226,14 @@ class OptSent(Object):
         if self._export:
             (self._outdir / self.unique_id).mkdir(parents=True, exist_ok=True)
         self._save_input()
-        self._build_graph()
-        self._save_graph()
+        if not self._load_graph():
+            if self._lazy:
+                self.info("Computing transition graph rows on demand.")
+                self._builder.attach_lazy(self._inputs)
+            else:
+                if not self._update_graph():
+                    self._build_graph()
+                self._save_graph()
         self._solve_optim()
         self._save_optim()
         return self._make_output_table()
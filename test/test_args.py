@@ -88,6 +88,16 @@ def test_optimizer_build():
             "cutoff": 0.0,
             "seqlen": -1,
             "maximize": False,
+            "restarts": 1,
+            "ncores": 1,
+            "beamwidth": 8,
+            "seed": None,
+            "chains": 1,
+            "nlists": 1,
+            "maxexact": 16,
+            "cooling": 0.9995,
+            "timebudget": 60.0,
+            "maxiter": -1,
         },
         {"optimizer": ValidOptimizer()},
     ):
@@ -98,6 +108,7 @@ def test_optimizer_build():
         {"optimizer": InvalidOptimizer()},
     ):
         check_raises(func, arg, TypeError)
+    check_raises(func, {"optimizer": ValidOptimizer(), "nlists": 2}, ValueError)
 
 
 def test_optimizer_prep():
@@ -115,8 +126,10 @@ def test_constraint_prep():
 
     func = ArgTool().prep_constraint
     check_output(func("repeats"))
+    assert func("repeats,length=3") == "repeats,length=3"
     check_raises(func, 123, TypeError)
-    check_raises(func, "fake", ValueError)
+    for arg in ("fake", "repeats,fake"):
+        check_raises(func, arg, ValueError)
 
 
 def test_cutoff_prep():
@@ -130,6 +143,26 @@ def test_cutoff_prep():
         check_raises(func, arg, TypeError)
 
 
+def test_annealing_prep():
+    func = ArgTool().prep_cooling
+    for arg in (0.5, 0.9995):
+        assert func(arg) == arg
+    check_raises(func, "0.9", TypeError)
+    for arg in (0, 1, 1.5):
+        check_raises(func, arg, ValueError)
+    func = ArgTool().prep_timebudget
+    for arg in (1, 0.5):
+        assert isinstance(func(arg), float)
+    check_raises(func, "60", TypeError)
+    check_raises(func, 0, ValueError)
+    func = ArgTool().prep_maxiter
+    for arg in (-1, 1, 1000):
+        assert func(arg) == arg
+    check_raises(func, 1.5, TypeError)
+    for arg in (-2, 0):
+        check_raises(func, arg, ValueError)
+
+
 def test_seqlen_prep():
     def check_output(seqlen):
         assert seqlen > 1 or seqlen == -1
@@ -143,6 +176,45 @@ def test_seqlen_prep():
         check_raises(func, arg, ValueError)
 
 
+def test_restarts_prep():
+    def check_output(restarts):
+        assert restarts > 0 or restarts == -1
+
+    func = ArgTool().prep_restarts
+    for arg in (-1, 1, 8):
+        check_output(func(arg))
+    for arg in ("10", 4.4):
+        check_raises(func, arg, TypeError)
+    for arg in (-2, 0):
+        check_raises(func, arg, ValueError)
+
+
+def test_beamwidth_prep():
+    def check_output(beamwidth):
+        assert beamwidth > 0
+
+    for func in (ArgTool().prep_beamwidth, ArgTool().prep_maxexact):
+        for arg in (1, 64):
+            check_output(func(arg))
+        for arg in ("10", 4.4):
+            check_raises(func, arg, TypeError)
+        for arg in (-1, 0):
+            check_raises(func, arg, ValueError)
+
+
+def test_sampling_prep():
+    func = ArgTool().prep_seed
+    for arg in (None, 0, 123):
+        assert func(arg) == arg
+    check_raises(func, 1.5, TypeError)
+    check_raises(func, -1, ValueError)
+    for func in (ArgTool().prep_chains, ArgTool().prep_nlists):
+        for arg in (1, 64):
+            assert func(arg) == arg
+        check_raises(func, "2", TypeError)
+        check_raises(func, 0, ValueError)
+
+
 def test_ncores_prep():
     def check_output(ncores, max_cores):
         assert np.abs(ncores) <= max_cores and ncores not in [0, -max_cores]
@@ -157,11 +229,108 @@ def test_ncores_prep():
         check_raises(func, arg, ValueError)
 
 
+def test_batchsize_prep():
+    def check_output(batchsize):
+        assert batchsize > 0
+
+    func = ArgTool().prep_batchsize
+    for arg in (1, 64):
+        check_output(func(arg))
+    for arg in ("16", 1.5):
+        check_raises(func, arg, TypeError)
+    for arg in (0, -1):
+        check_raises(func, arg, ValueError)
+
+
+def test_builder_prep():
+    def check_output(value, arg):
+        assert value == arg
+
+    func = ArgTool().prep_blocksize
+    for arg in (-1, 1, 256):
+        check_output(func(arg), arg)
+    check_raises(func, 1.5, TypeError)
+    for arg in (0, -2):
+        check_raises(func, arg, ValueError)
+    func = ArgTool().prep_backend
+    for arg in ("thread", "process"):
+        check_output(func(arg), arg)
+    check_raises(func, 1, TypeError)
+    check_raises(func, "fake", ValueError)
+
+
+def test_cache_prep():
+    def check_output(value, arg):
+        assert value == arg
+
+    func = ArgTool().prep_cachedir
+    dirname = pathlib.Path(__file__).parents[1] / "outputs" / "cache"
+    for arg in (None, dirname):
+        check_output(func(arg), arg)
+    check_output(func(str(dirname)), dirname.resolve())
+    check_raises(func, 123, TypeError)
+    func = ArgTool().prep_cachesize
+    check_output(func(10), 10)
+    check_raises(func, 1.5, TypeError)
+    check_raises(func, 0, ValueError)
+    func = ArgTool().prep_precision
+    for arg in ("fp32", "bf16", "int8"):
+        check_output(func(arg), arg)
+    check_raises(func, 32, TypeError)
+    check_raises(func, "fp16", ValueError)
+    func = ArgTool().prep_separator
+    for arg in (None, "\n"):
+        check_output(func(arg), arg)
+    check_raises(func, 1, TypeError)
+
+
+def test_basegraph_prep():
+    def check_output(value, arg):
+        assert value == arg
+
+    func = ArgTool().prep_basegraph
+    dirname = pathlib.Path(__file__).parent / "test_inputs"
+    check_output(func(None), None)
+    for arg in (dirname, str(dirname), dirname / "test_strings.txt"):
+        check_output(func(arg), dirname.resolve())
+    check_raises(func, 123, TypeError)
+    check_raises(func, "fake_dir", FileNotFoundError)
+
+
+def test_graphfmt_prep():
+    def check_output(graphfmt, arg):
+        assert graphfmt == arg
+
+    func = ArgTool().prep_graphfmt
+    for arg in ("auto", "npy", "csv"):
+        check_output(func(arg), arg)
+    check_raises(func, 123, TypeError)
+    check_raises(func, "parquet", ValueError)
+
+
+def test_graph_repr_prep():
+    def check_output(value, arg):
+        assert value == arg
+
+    func = ArgTool().prep_dtype
+    for arg in ("float64", "float32"):
+        check_output(func(arg), arg)
+    check_raises(func, 32, TypeError)
+    check_raises(func, "float16", ValueError)
+    for func in (ArgTool().prep_topk, ArgTool().prep_prune):
+        for arg in (-1, 1, 50):
+            check_output(func(arg), arg)
+        check_raises(func, 1.5, TypeError)
+        for arg in (0, -2):
+            check_raises(func, arg, ValueError)
+
+
 def test_flag_prep():
     def check_output(value, arg):
         assert value == arg
 
-    for func in (ArgTool().prep_maximize, ArgTool().prep_export):
+    for func in (ArgTool().prep_maximize, ArgTool().prep_export, ArgTool().prep_cache,
+                 ArgTool().prep_reuse_graph, ArgTool().prep_lazy):
         for arg in (True, False):
             check_output(func(arg), arg)
         check_raises(func, "True", TypeError)
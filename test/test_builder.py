@@ -0,0 +1,180 @@
+import numpy as np
+
+from test_abstract import check_raises
+
+from optsent.abstract import IModel, IObjective
+from optsent.args import ArgTool
+from optsent.builder import GraphBuilder, evaluate_tile
+from optsent.data import SparseGraph
+from optsent.models import Model
+from optsent.objectives import Objective
+
+
+class MockLengthModel(IModel):
+    @staticmethod
+    def score(sent):
+        return float(len(sent))
+
+
+class MockDiffObjective(IObjective):
+    @staticmethod
+    def evaluate(sent1, sent2, model):
+        return model.score(sent2) - model.score(sent1)
+
+
+def get_expected(sents):
+    lengths = np.array([len(sent) for sent in sents], dtype=np.float64)
+    expected = lengths[np.newaxis, :] - lengths[:, np.newaxis]
+    np.fill_diagonal(expected, np.nan)
+    return expected
+
+
+def test_builder_constructor():
+    cls = GraphBuilder
+    assert cls.supported_backends() == {"thread", "process"}
+    check_raises(cls, (MockDiffObjective(), MockLengthModel(), "fake"), ValueError)
+
+
+def test_builder_tile():
+    def check_output(values, expected):
+        np.testing.assert_array_equal(values, expected)
+
+    sents = ["a", "ab", "abc", "abcd"]
+    expected = get_expected(sents)
+    model = MockLengthModel()
+    for rows, cols in ((range(0, 2), range(0, 4)), (range(1, 3), range(2, 4))):
+        values = evaluate_tile(
+            MockDiffObjective(),
+            model,
+            [sents[r] for r in rows],
+            [sents[c] for c in cols],
+            rows,
+            cols,
+        )
+        check_output(values, expected[rows.start : rows.stop, cols.start : cols.stop])
+    values = evaluate_tile(
+        MockDiffObjective(), model, sents, sents, range(4), range(4), np.float32
+    )
+    assert values.dtype == np.float32
+    check_output(values, expected.astype(np.float32))
+
+
+def test_builder_tiles():
+    def check_output(tiles, indices, cells):
+        assert all(rows.size * cols.size <= cells for rows, cols in tiles)
+        assert all(np.array_equal(cols, indices) for _, cols in tiles)
+        np.testing.assert_array_equal(np.concatenate([r for r, _ in tiles]), indices)
+
+    builder = GraphBuilder(Objective("embsim"), MockLengthModel())
+    indices = np.arange(10)
+    for cells in (10, 25, 100):
+        builder._tile_cells = cells
+        check_output(builder._tiles(indices, indices), indices, cells)
+
+
+def test_builder_build():
+    def check_side_effect(coll, expected):
+        np.testing.assert_array_equal(coll.graph.matrix, expected)
+
+    sents = ["a", "ab", "abc", "abcd", "abcde"]
+    for objective in (MockDiffObjective(), Objective("normlogp")):
+        for blocksize in (-1, 1, 2, 5, 8):
+            coll = ArgTool().prep_inputs(sents)
+            builder = GraphBuilder(objective, MockLengthModel(), "thread", blocksize)
+            builder.build(coll)
+            if isinstance(objective, Objective):
+                expected = np.zeros((len(sents), len(sents)))
+                np.fill_diagonal(expected, np.nan)
+            else:
+                expected = get_expected(sents)
+            check_side_effect(coll, expected)
+    check_raises(builder.build, sents, TypeError)
+
+
+def test_builder_update():
+    def check_side_effect(coll, sents):
+        np.testing.assert_array_equal(coll.graph.matrix, get_expected(sents))
+
+    class MockCountingObjective(MockDiffObjective):
+        def __init__(self):
+            self.calls = 0
+
+        def evaluate(self, sent1, sent2, model):
+            self.calls += 1
+            return super().evaluate(sent1, sent2, model)
+
+    base = ["a", "ab", "abc", "abcd"]
+    coll = ArgTool().prep_inputs(base)
+    GraphBuilder(MockDiffObjective(), MockLengthModel()).build(coll)
+    sents = ["abcd", "xyz", "a", "abc", "abcdefg"]
+    objective = MockCountingObjective()
+    builder = GraphBuilder(objective, MockLengthModel(), blocksize=2)
+    updated = ArgTool().prep_inputs(sents)
+    builder.update(updated, base, coll.graph.matrix)
+    check_side_effect(updated, sents)
+    assert objective.calls == 2 * 4 + 3 * 2
+    check_raises(builder.update, (sents, base, coll.graph.matrix), TypeError)
+    check_raises(builder.update, (updated, base[:2], coll.graph.matrix), ValueError)
+
+
+def test_builder_processes():
+    def check_side_effect(coll, expected):
+        assert not isinstance(coll.graph.matrix, np.memmap)
+        np.testing.assert_allclose(coll.graph.matrix, expected, rtol=1e-5)
+
+    sents = ["I went to the park", "This is for unit testing", "And is a haiku."]
+    objective, model = Objective("normlogp"), Model("gpt2")
+    expected = ArgTool().prep_inputs(sents)
+    GraphBuilder(objective, model, "thread").build(expected)
+    coll = ArgTool().prep_inputs(sents)
+    GraphBuilder(objective, model, "process", 2, 1).build(coll)
+    check_side_effect(coll, expected.graph.matrix)
+
+
+def test_builder_lazy():
+    def check_side_effect(coll, expected, computed):
+        np.testing.assert_array_equal(coll.graph.row(1), expected[1])
+        assert coll.graph.computed == computed
+
+    sents = ["a", "ab", "abc", "abcd", "abcde"]
+    expected = get_expected(sents)
+    coll = ArgTool().prep_inputs(sents)
+    builder = GraphBuilder(MockDiffObjective(), MockLengthModel())
+    builder.attach_lazy(coll)
+    check_side_effect(coll, expected, 1)
+    np.testing.assert_array_equal(coll.graph.matrix, expected)
+    check_raises(builder.attach_lazy, sents, TypeError)
+
+
+def test_builder_prune():
+    class MockEmbedModel(MockLengthModel):
+        @staticmethod
+        def embed(sent):
+            return np.array([[1.0, len(sent) / 10]], dtype=np.float32)
+
+    class MockCountingObjective(MockDiffObjective):
+        def __init__(self):
+            self.calls = 0
+
+        def evaluate(self, sent1, sent2, model):
+            self.calls += 1
+            return super().evaluate(sent1, sent2, model)
+
+    def check_side_effect(coll, expected, neighbours):
+        for row, cols in enumerate(neighbours):
+            assert set(coll.graph.indices[row]) == set(cols)
+            np.testing.assert_array_equal(
+                coll.graph.row(row)[cols], expected[row, cols]
+            )
+
+    sents = ["a", "ab", "abc", "abcd", "abcde"]
+    coll = ArgTool().prep_inputs(sents)
+    coll.graph = SparseGraph(coll.size, 2, maximize=True)
+    objective = MockCountingObjective()
+    GraphBuilder(objective, MockEmbedModel(), prune=2).build(coll)
+    neighbours = [[1, 2], [0, 2], [1, 3], [2, 4], [2, 3]]
+    check_side_effect(coll, get_expected(sents), neighbours)
+    assert objective.calls == 2 * len(sents)
+    check_raises(
+        GraphBuilder, (objective, MockEmbedModel(), "thread", -1, 1, 0), ValueError
+    )
@@ -0,0 +1,49 @@
+import numpy as np
+
+from test_abstract import check_raises
+
+from optsent.cache import Cache
+
+
+def test_cache_constructor():
+    def check_output(cache, persistent):
+        assert cache.persistent == persistent
+        assert cache.hits == cache.misses == 0
+
+    cls = Cache
+    check_output(cls("gpt2", "main"), False)
+    for arg in (
+        (123, "main"),
+        ("gpt2", None),
+        ("gpt2", "main", "dir"),
+        ("gpt2", "main", None, 1.5),
+    ):
+        check_raises(cls, arg, TypeError)
+    check_raises(cls, ("gpt2", "main", None, 0), ValueError)
+
+
+def test_cache_lru():
+    def check_output(found, keys):
+        assert set(found) == set(keys)
+
+    cache = Cache("gpt2", "main", capacity=2)
+    cache.update("score", {s: np.array([float(len(s))]) for s in ("a", "bb", "ccc")})
+    check_output(cache.lookup("score", ["a", "bb", "ccc"]), ["bb", "ccc"])
+    check_output(cache.lookup("embed", ["bb"]), [])
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_cache_persistent(tmp_path):
+    def check_output(found, values):
+        assert set(found) == set(values)
+        for key, value in values.items():
+            np.testing.assert_array_equal(found[key], value)
+            assert found[key].dtype == value.dtype
+
+    values = {"abc": np.array([-1.5]), "def": np.arange(4, dtype=np.float32)}
+    Cache("gpt2", "main", tmp_path).update("score", values)
+    cache = Cache("gpt2", "main", tmp_path, capacity=1)
+    check_output(cache.lookup("score", ["abc", "def", "ghi"]), values)
+    assert (cache.hits, cache.misses) == (2, 1)
+    check_output(Cache("gpt2", "other", tmp_path).lookup("score", ["abc"]), {})
+    check_output(Cache("gpt2", "main", tmp_path).lookup("embed", ["abc"]), {})
@@ -0,0 +1,63 @@
+import numpy as np
+import numpy.testing as npt
+import pandas as pd
+
+from test_abstract import check_raises
+
+from optsent.args import ArgTool
+from optsent.constraints import Constraint, _ConstraintKernel
+
+
+def get_coll():
+    inputs = pd.DataFrame(
+        {
+            "Sentence": ["The cat", "Cat sat.", "", "dogs, the bird flew home"],
+            "Condition": ["a", "a", "b", np.nan],
+        }
+    )
+    return ArgTool().prep_inputs(inputs)
+
+
+def test_constraint_constructor():
+    def check_output(constraint):
+        assert callable(constraint)
+
+    cls = Constraint
+    for arg in ("none", "repeats", "repeats,length=2", "content, condition"):
+        check_output(cls(arg))
+    check_raises(cls, 1, TypeError)
+    for arg in ("fake", "repeats,fake", "length=abc"):
+        check_raises(cls, arg, ValueError)
+
+
+def test_constraint_kernels():
+    def check_output(mask, forbidden):
+        expected = np.ones((4, 4), dtype=bool)
+        for pair in forbidden:
+            expected[pair] = False
+        npt.assert_array_equal(mask, expected)
+
+    coll = get_coll()
+    check_output(Constraint("none")(coll), [])
+    check_output(Constraint("repeats")(coll), [(0, 1)])
+    check_output(Constraint("content")(coll), [(0, 0), (0, 1), (1, 0), (1, 1)])
+    length = [(0, 3), (3, 0), (1, 3), (3, 1), (2, 3), (3, 2)]
+    check_output(Constraint("length=2")(coll), length)
+    check_output(
+        Constraint("condition")(coll), [(0, 0), (0, 1), (1, 0), (1, 1), (2, 2)]
+    )
+    check_output(Constraint("repeats,length=2")(coll), [(0, 1)] + length)
+    check_raises(Constraint("condition=Missing"), coll, ValueError)
+
+
+def test_constraint_register(monkeypatch):
+    class NoSelfLoops(_ConstraintKernel):
+        def __call__(self, sents):
+            return ~np.eye(sents.size, dtype=bool)
+
+    monkeypatch.setattr(Constraint, "_registry", {})
+    Constraint.register("noloops", NoSelfLoops)
+    assert "noloops" in Constraint.supported_constraints()
+    npt.assert_array_equal(Constraint("noloops")(get_coll()), ~np.eye(4, dtype=bool))
+    check_raises(Constraint.register, ("bad", object), TypeError)
+    check_raises(Constraint.register, ("repeats", NoSelfLoops), ValueError)
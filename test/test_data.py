@@ -1,9 +1,10 @@
 import numpy as np
 import pandas as pd
+import pytest
 
 from test_abstract import check_raises
 
-from optsent.data import Graph, SentenceCollection
+from optsent.data import Graph, LazyGraph, SentenceCollection, SparseGraph
 
 
 def test_graph_contructor():
@@ -35,6 +36,145 @@ def test_graph_writer():
         check_raises(func, arg, ValueError)
 
 
+def test_graph_block_writer():
+    def check_side_effect(graph, i, j, values):
+        values = np.asarray(values)
+        block = graph.matrix[i : i + values.shape[0], j : j + values.shape[1]]
+        np.testing.assert_array_equal(block, values)
+
+    dim = 4
+    graph = Graph(dim)
+    func = graph.write_transition_block
+    for arg in ((1, 0, np.ones((2, dim))), (3, 1, [[np.nan, 1.5, 2.5]])):
+        func(*arg)
+        check_side_effect(graph, *arg)
+    for arg in ((1.0, 0, np.ones((1, dim))), (0, 0, [["a", "b"]])):
+        check_raises(func, arg, TypeError)
+    for arg in ((3, 0, np.ones((2, dim))), (0, 1, np.ones((1, dim))), (0, 0, [1, 2])):
+        check_raises(func, arg, ValueError)
+
+
+def test_graph_tile_writer():
+    def check_side_effect(graph, rows, cols, values):
+        np.testing.assert_array_equal(graph.matrix[np.ix_(rows, cols)], values)
+
+    dim = 5
+    graph = Graph(dim)
+    func = graph.write_transition_tile
+    for arg in (([0, 3], [1, 2, 4], np.ones((2, 3))), ([4], [0], [[7.5]])):
+        func(*arg)
+        check_side_effect(graph, *arg)
+    for arg in (([0.5], [1], [[1]]), ([0], [1], [["a"]])):
+        check_raises(func, arg, TypeError)
+    for arg in (([0], [1, 2], [[1]]), ([5], [1], [[1]])):
+        check_raises(func, arg, ValueError)
+
+
+def test_graph_from_matrix():
+    def check_output(graph, matrix):
+        assert graph.dim == matrix.shape[0]
+        assert graph.matrix is matrix
+
+    cls = Graph.from_matrix
+    for arg in (np.zeros((2, 2)), np.arange(9.0).reshape(3, 3)):
+        check_output(cls(arg), arg)
+    check_raises(cls, [[0, 1], [1, 0]], TypeError)
+    for arg in (np.zeros((2, 3)), np.zeros(4), np.zeros((1, 1))):
+        check_raises(cls, arg, ValueError)
+
+
+def test_graph_dtype():
+    def check_output(graph, dtype):
+        assert graph.dtype == dtype
+        assert graph.matrix.dtype == dtype
+
+    for arg in (np.float32, np.float64):
+        check_output(Graph(3, arg), arg)
+    graph = Graph.from_matrix(np.arange(9.0).reshape(3, 3))
+    np.testing.assert_array_equal(graph.weights([0, 2], [1, 0]), [1.0, 6.0])
+    check_raises(Graph, (3, np.int64), ValueError)
+
+
+def test_sparse_graph():
+    def check_output(graph, matrix, k):
+        expected = np.full_like(matrix, np.nan)
+        for i, row in enumerate(matrix):
+            best = np.argsort(np.where(np.isnan(row), np.inf, row))[:k]
+            expected[i, best] = row[best]
+        np.testing.assert_array_equal(graph.matrix, expected)
+        np.testing.assert_array_equal(graph.row(1), expected[1])
+        np.testing.assert_array_equal(graph.rows([3, 1]), expected[[3, 1]])
+        np.testing.assert_array_equal(
+            graph.weights([0, 3, 2], [1, 1, 4]), expected[[0, 3, 2], [1, 1, 4]]
+        )
+        np.testing.assert_array_equal(
+            graph.column_extremum(False), np.nanmin(expected, axis=0)
+        )
+
+    matrix = np.arange(25.0).reshape(5, 5)[:, ::-1].copy()
+    np.fill_diagonal(matrix, np.nan)
+    for k in (1, 2, 4):
+        graph = SparseGraph(5, k)
+        assert graph.is_empty()
+        cols = np.arange(5)
+        for rows in (cols[:3], cols[3:]):
+            for block in (cols[:2], cols[2:]):
+                graph.write_transition_tile(rows, block, matrix[np.ix_(rows, block)])
+        check_output(graph, matrix, k)
+        check_output(SparseGraph.from_dense(matrix, k), matrix, k)
+    graph = SparseGraph.from_dense(matrix, 2)
+    graph.write_transition_weight(0, 4, 100.0)
+    np.testing.assert_array_equal(graph.row(0), [np.nan, np.nan, np.nan, 1.0, 100.0])
+    graph.write_transition_weight(1, 0, 50.0)
+    np.testing.assert_array_equal(graph.row(1), [np.nan, np.nan, np.nan, 6.0, 5.0])
+    graph.write_transition_weight(1, 2, -1.0)
+    np.testing.assert_array_equal(graph.row(1), [np.nan, np.nan, -1.0, np.nan, 5.0])
+    assert SparseGraph(3, 10).k == 3
+    check_raises(SparseGraph, (3, 1.5), TypeError)
+    check_raises(SparseGraph, (3, 0), ValueError)
+
+
+def test_lazy_graph():
+    matrix = np.arange(36.0).reshape(6, 6)
+    calls = []
+
+    def compute(rows):
+        calls.append(rows.tolist())
+        return matrix[rows]
+
+    graph = LazyGraph(6, compute, probe=2)
+    assert not graph.is_empty() and graph.computed == 0
+    np.testing.assert_array_equal(graph.row(3), matrix[3])
+    np.testing.assert_array_equal(graph.rows([3, 1, 3]), matrix[[3, 1, 3]])
+    assert calls == [[3], [1]]
+    np.testing.assert_array_equal(graph.weights([1, 4], [2, 0]), [8.0, 24.0])
+    rows, cols = np.array([[1, 3], [4, 1]]), np.array([[0, 1], [2, 3]])
+    np.testing.assert_array_equal(graph.weights(rows, cols), matrix[rows, cols])
+    np.testing.assert_array_equal(graph.column_extremum(False), matrix[1])
+    assert graph.computed == 3
+    np.testing.assert_array_equal(
+        LazyGraph(6, compute, probe=2).column_extremum(True), matrix[5]
+    )
+    assert calls[-1] == [0, 5]
+    np.testing.assert_array_equal(graph.matrix, matrix)
+    check_raises(graph.write_transition_weight, (0, 1, 1.0), RuntimeError)
+    check_raises(LazyGraph, (6, "compute"), TypeError)
+    check_raises(LazyGraph, (6, compute, np.float64, 0), ValueError)
+
+
+def test_collection_graph_setter():
+    def check_side_effect(coll, graph):
+        assert coll.graph is graph
+
+    coll = SentenceCollection(pd.Series(["abc", "123"]))
+    graph = Graph(2)
+    coll.graph = graph
+    check_side_effect(coll, graph)
+    for arg, exception in ((np.zeros((2, 2)), TypeError), (Graph(3), ValueError)):
+        with pytest.raises(exception):
+            coll.graph = arg
+
+
 def test_collection_constructor():
     def check_output(coll, sents):
         pd.testing.assert_series_equal(coll.sentences, sents)
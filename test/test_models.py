@@ -1,3 +1,4 @@
+import pickle
 import string
 
 import numpy as np
@@ -5,7 +6,7 @@ import numpy as np
 from test_abstract import check_raises, check_interface
 
 from optsent.abstract import IModel
-from optsent.models import Model
+from optsent.models import CompiledModel, Model
 
 
 def test_model_constructor():
@@ -34,6 +35,109 @@ def test_model_score():
     check_pair(func("Subset of a"), func("Subset of a superset."))
 
 
+def test_model_score_batch():
+    def check_output(scores, sents):
+        assert scores.shape == (len(sents),)
+
+    def check_same(scores, sents, model):
+        for score, sent in zip(scores, sents):
+            np.testing.assert_approx_equal(score, model.score(sent), significant=5)
+
+    model = Model("gpt2", batchsize=2)
+    func = model.score_batch
+    sents = [
+        "I went to the store",
+        "Same string.",
+        string.printable,
+        "a",
+        "Same string.",
+    ]
+    check_output(func(sents), sents)
+    check_same(func(sents), sents, Model("gpt2"))
+    for arg in ("abc", [123], ["abc", []]):
+        check_raises(func, arg, TypeError)
+    check_raises(Model, ("gpt2", 1.5), TypeError)
+    check_raises(Model, ("gpt2", 0), ValueError)
+
+
+def test_model_score_continuations():
+    def check_same(scores, prefix, sents, model):
+        for score, sent in zip(scores, sents):
+            np.testing.assert_approx_equal(
+                score, model.score(prefix + sent), significant=5
+            )
+
+    model = Model("gpt2", batchsize=2)
+    func = model.score_continuations
+    assert model.supports_prefix_cache
+    prefix, sents = "Hello, ", ["my name", "name my", "", string.printable]
+    check_same(func(prefix, sents), prefix, sents, Model("gpt2"))
+    for arg in ((123, ["abc"]), ("abc", "abc"), ("abc", [123])):
+        check_raises(func, arg, TypeError)
+
+
+def test_model_score_pairs():
+    def check_same(scores, prefix, sents, model, separator=""):
+        for score, sent in zip(scores, sents):
+            np.testing.assert_approx_equal(
+                score, model.score(prefix + separator + sent), significant=5
+            )
+
+    model = Model("gpt2", batchsize=2)
+    func = model.score_pairs
+    prefix, sents = "Hello,", [" my name", " name my", "", " is it"]
+    check_same(func(prefix, sents), prefix, sents, model)
+    check_same(func("", sents[:2]), "", sents[:2], model)
+    assert model.encode(["Hello,"]) == [model.encode(["Hello,", "a"])[0]]
+    model = Model("gpt2", separator="\n")
+    assert model.separator == "\n"
+    check_same(model.score_pairs("A.", ["B."]), "A.", ["B."], model, "\n")
+    for arg in ((123, ["abc"]), ("abc", "abc"), ("abc", [123])):
+        check_raises(func, arg, TypeError)
+    check_raises(model.encode, "abc", TypeError)
+    check_raises(Model, ("gpt2", 16, None, 65536, 1), TypeError)
+
+
+def test_model_precision():
+    def check_close(scores, expected, atol):
+        np.testing.assert_allclose(scores, expected, atol=atol)
+
+    sents = ["I went to the store", "Same string.", string.printable]
+    expected = Model("gpt2").score_batch(sents)
+    assert Model.supported_precisions() == {"fp32", "bf16", "int8"}
+    for precision in ("bf16", "int8"):
+        model = Model("gpt2", precision=precision)
+        assert model.precision == precision
+        check_close(model.score_batch(sents), expected, 1.0)
+        check_close(
+            model.score_pairs("Hello,", [" my name"]),
+            model.score_batch(["Hello, my name"]),
+            0.1,
+        )
+    check_raises(Model, ("gpt2", 16, None, 65536, None, 32), TypeError)
+    check_raises(Model, ("gpt2", 16, None, 65536, None, "fp16"), ValueError)
+    check_raises(Model, ("gpt2", 16, None, 65536, None, "int8", "yes"), TypeError)
+
+
+def test_model_calibrate(monkeypatch):
+    calls = []
+    timed_logp = Model._timed_logp
+    monkeypatch.setattr(
+        Model,
+        "_timed_logp",
+        lambda self, encodings: calls.append(1) or timed_logp(self, encodings),
+    )
+    model = Model("gpt2", precision="int8")
+    assert not calls
+    model = Model("gpt2", precision="int8", calibrate=True)
+    assert len(calls) == 4
+    clone = pickle.loads(pickle.dumps(model))
+    assert clone.precision == "int8" and len(calls) == 4
+    monkeypatch.setattr(Model, "_bf16_supported", staticmethod(lambda: False))
+    assert Model("gpt2", precision="bf16", calibrate=True).precision == "fp32"
+    assert len(calls) == 4
+
+
 def test_model_embed():
     def check_output(emb):
         assert emb.ndim == 2
@@ -50,3 +154,58 @@ def test_model_embed():
     for arg in (123, []):
         check_raises(func, arg, TypeError)
     check_same(func("Same string."), func("Same string."))
+
+
+def test_model_embed_batch():
+    def check_output(embs, sents):
+        assert embs.dtype == np.float32
+        assert embs.shape[0] == len(sents)
+
+    def check_same(embs, sents, model):
+        for emb, sent in zip(embs, sents):
+            np.testing.assert_allclose(emb, model.embed(sent)[0], rtol=1e-4, atol=1e-5)
+
+    model = Model("gpt2", batchsize=2)
+    func = model.embed_batch
+    sents = ["I went to the store", "Same string.", string.printable, "a"]
+    check_output(func(sents), sents)
+    check_same(func(sents), sents, Model("gpt2"))
+    for arg in ("abc", [123]):
+        check_raises(func, arg, TypeError)
+
+
+def test_model_cache(tmp_path):
+    def check_output(model, hits, misses):
+        assert (model.cache.hits, model.cache.misses) == (hits, misses)
+
+    sents = ["I went to the store", "Same string."]
+    model = Model("gpt2", cachedir=tmp_path)
+    scores, embs = model.score_batch(sents), model.embed_batch(sents)
+    check_output(model, 0, 4)
+    model = Model("gpt2", cachedir=tmp_path, cachesize=1)
+    np.testing.assert_array_equal(model.score_batch(sents), scores)
+    np.testing.assert_array_equal(model.embed_batch(sents), embs)
+    check_output(model, 4, 0)
+    check_raises(Model, ("gpt2", 16, str(tmp_path)), TypeError)
+
+
+def test_compiled_model():
+    def check_same(scores, expected):
+        np.testing.assert_allclose(scores, expected, rtol=1e-5)
+
+    sents = ["I went to the store", "Same string.", string.printable, "a"]
+    expected = Model("gpt2").score_batch(sents)
+    model = CompiledModel("gpt2", batchsize=2, lengths=(8, 16), backend="eager")
+    check_interface(model, IModel)
+    assert model.compiled and not model.supports_prefix_cache
+    check_same(model.score_batch(sents), expected)
+    assert pickle.loads(pickle.dumps(model)).compiled
+    fallback = CompiledModel("gpt2", lengths=(8,), backend="fake")
+    assert not fallback.compiled
+    check_same(fallback.score_batch(sents), expected)
+    check_raises(
+        CompiledModel, ("gpt2", 16, None, 65536, None, "fp32", [1.5]), TypeError
+    )
+    check_raises(
+        CompiledModel, ("gpt2", 16, None, 65536, None, "fp32", [1]), ValueError
+    )
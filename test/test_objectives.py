@@ -26,6 +26,25 @@ def test_objective_normlogp():
         check_raises(func, arg, TypeError)
 
 
+def test_objective_block():
+    def check_output(block, sents1, sents2, func, model):
+        assert block.shape == (len(sents1), len(sents2))
+        for i, sent1 in enumerate(sents1):
+            for j, sent2 in enumerate(sents2):
+                np.testing.assert_approx_equal(
+                    block[i, j], func(sent1, sent2, model), significant=5
+                )
+
+    model = Model("gpt2")
+    sents1, sents2 = ["Hello, ", "this is a cat"], ["my name", "name my", "a dog"]
+    for arg in Objective.supported_functions():
+        cls = Objective(arg)
+        block = cls.evaluate_block(sents1, sents2, model)
+        check_output(block, sents1, sents2, cls.evaluate, model)
+        for args in (("a", ["b"], model), (["a"], [1], model), (["a"], ["b"], "c")):
+            check_raises(cls.evaluate_block, args, TypeError)
+
+
 def test_objective_embsim():
     def check_same(obj):
         np.testing.assert_approx_equal(obj, np.Inf)
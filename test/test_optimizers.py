@@ -2,10 +2,12 @@ import itertools
 import pathlib
 
 import numpy as np
+import numpy.testing as npt
 
 from test_abstract import check_raises
 
 from optsent.args import ArgTool
+from optsent.data import Graph, SparseGraph
 from optsent.optimizers import Optimizer
 
 
@@ -32,6 +34,7 @@ def test_optimizer_constructor():
         ("", "", "", 1, True),
         ("", "", 0.0, "", True),
         ("", "", 0.0, 1, 1),
+        ("", "", 0.0, 1, True, 1.5),
     ):
         check_raises(cls, arg, TypeError)
     for arg in (
@@ -111,13 +114,182 @@ def test_optimizer_greedy_maximize():
     check_side_effect(cls)
 
 
+def test_optimizer_graph_unmodified():
+    def check_side_effect(coll, matrix):
+        npt.assert_array_equal(coll.graph.matrix, matrix)
+
+    for optimizer in Optimizer.supported_optimizers():
+        coll = get_default_coll()
+        fill_graph(coll)
+        matrix = coll.graph.matrix.copy()
+        Optimizer(optimizer, "none", 0.0, -1, False).solve(coll)
+        check_side_effect(coll, matrix)
+
+
+def test_optimizer_greedy_sparse():
+    def check_side_effect(cls, dense):
+        assert cls.indices == dense.indices
+        npt.assert_array_equal(cls.values, dense.values)
+
+    for maximize in (False, True):
+        coll = get_default_coll()
+        fill_graph(coll)
+        matrix = coll.graph.matrix.copy()
+        np.fill_diagonal(matrix, np.nan)
+        coll.graph = Graph.from_matrix(matrix)
+        dense = Optimizer("greedy", "repeats", 0.0, -1, maximize)
+        dense.solve(coll)
+        coll.graph = SparseGraph.from_dense(matrix, 2, maximize)
+        cls = Optimizer("greedy", "repeats", 0.0, -1, maximize)
+        cls.solve(coll)
+        check_side_effect(cls, dense)
+
+
+def test_optimizer_greedy_restarts():
+    def check_side_effect(cls, graph):
+        cost = sum(graph[i, j] for i, j in zip(cls.indices, cls.indices[1:]))
+        assert cost == np.nansum(cls.values)
+        assert sorted(cls.indices) == list(range(graph.shape[0]))
+        return cost
+
+    graph = np.array(
+        [[np.nan, 1, 9, 9], [9, np.nan, 1, 9], [9, 9, np.nan, 9], [0, 9, 9, np.nan]]
+    )
+    coll = ArgTool().prep_inputs(["a", "b", "c", "d"])
+    coll.graph = Graph.from_matrix(graph)
+    single = Optimizer("greedy", "none", 0.0, -1, False)
+    single.solve(coll)
+    assert check_side_effect(single, graph) == 11
+    for restarts in (-1, 4, 10):
+        cls = Optimizer("greedy", "none", 0.0, -1, False, restarts, 2)
+        cls.solve(coll)
+        assert check_side_effect(cls, graph) == 2
+    np.random.seed(0)
+    cls = Optimizer("greedy", "none", 0.0, -1, False, 2)
+    cls.solve(coll)
+    assert check_side_effect(cls, graph) <= 11
+
+
+def test_optimizer_local_search():
+    def check_side_effect(cls, graph, cost):
+        assert sorted(cls.indices) == list(range(graph.shape[0]))
+        assert np.nansum(cls.values) == cost
+        assert np.isnan(cls.values[0])
+
+    graph = np.array(
+        [[np.nan, 1, 9, 9], [9, np.nan, 1, 9], [9, 9, np.nan, 9], [0, 9, 9, np.nan]]
+    )
+    coll = ArgTool().prep_inputs(["a", "b", "c", "d"])
+    coll.graph = Graph.from_matrix(graph)
+    cls = Optimizer("greedy+ls", "none", 0.0, -1, False)
+    cls.solve(coll)
+    check_side_effect(cls, graph, 2)
+    coll.graph = Graph.from_matrix(-graph)
+    cls = Optimizer("greedy+ls", "none", 0.0, -1, True)
+    cls.solve(coll)
+    check_side_effect(cls, graph, -2)
+    greedy = Optimizer("greedy", "repeats", 0.0, -1, False)
+    cls = Optimizer("greedy+ls", "repeats", 0.0, -1, False)
+    coll = get_default_coll()
+    fill_graph(coll)
+    greedy.solve(coll)
+    cls.solve(coll)
+    assert np.nansum(cls.values) <= np.nansum(greedy.values)
+    coll = ArgTool().prep_inputs(list("abcdefgh"))
+    coll.graph = Graph.from_matrix(np.random.default_rng(0).random((8, 8)))
+    greedy.solve(coll)
+    for budget, moves in (({"timebudget": 1e-9}, 0), ({"maxiter": 1}, 1)):
+        cls = Optimizer("greedy+ls", "none", 0.0, -1, False, **budget)
+        cls.solve(coll)
+        changed = sum(a != b for a, b in zip(cls.indices, greedy.indices))
+        assert (changed > 0) == (moves > 0)
+
+
+def test_optimizer_heldkarp():
+    def check_side_effect(cls, graph, seqlen):
+        assert len(set(cls.indices)) == len(cls.indices) == seqlen
+        costs = [
+            sum(graph[i, j] for i, j in zip(path, path[1:]))
+            for path in itertools.permutations(range(graph.shape[0]), seqlen)
+        ]
+        assert np.isclose(np.nansum(cls.values), min(costs))
+
+    rng = np.random.default_rng(0)
+    graph = rng.random((6, 6))
+    np.fill_diagonal(graph, np.nan)
+    coll = ArgTool().prep_inputs(list("abcdef"))
+    coll.graph = Graph.from_matrix(graph)
+    for seqlen in (-1, 2, 4):
+        cls = Optimizer("heldkarp", "none", 0.0, seqlen, False)
+        cls.solve(coll)
+        check_side_effect(cls, graph, 6 if seqlen == -1 else seqlen)
+    greedy = Optimizer("greedy", "none", 0.0, -1, False)
+    greedy.solve(coll)
+    cls = Optimizer("heldkarp", "none", 0.0, -1, False, maxexact=4)
+    cls.solve(coll)
+    assert cls.indices == greedy.indices
+    coll = ArgTool().prep_inputs([str(i) for i in range(20)])
+    cls = Optimizer("heldkarp", "none", 0.0, -1, False)
+    check_raises(cls.solve, coll, RuntimeError)
+    coll.graph.write_transition_weight(0, 1, 1.0)
+    cls.solve(coll)
+    assert len(cls.indices) == 20
+
+
+def test_optimizer_beam():
+    def check_side_effect(cls, other):
+        assert len(set(cls.indices)) == len(cls.indices)
+        assert np.isclose(np.nansum(cls.values), np.nansum(other.values))
+
+    rng = np.random.default_rng(0)
+    graph = rng.random((6, 6))
+    np.fill_diagonal(graph, np.nan)
+    coll = ArgTool().prep_inputs(list("abcdef"))
+    coll.graph = Graph.from_matrix(graph)
+    for maximize, seqlen in itertools.product((False, True), (-1, 3)):
+        exact = Optimizer("heldkarp", "none", 0.0, seqlen, maximize)
+        exact.solve(coll)
+        cls = Optimizer("beam", "none", 0.0, seqlen, maximize, beamwidth=64)
+        cls.solve(coll)
+        check_side_effect(cls, exact)
+        greedy = Optimizer("greedy", "none", 0.0, seqlen, maximize)
+        greedy.solve(coll)
+        cls = Optimizer("beam", "none", 0.0, seqlen, maximize, beamwidth=1)
+        cls.solve(coll)
+        assert cls.indices == greedy.indices
+        check_side_effect(cls, greedy)
+    coll.graph = SparseGraph.from_dense(graph, 3)
+    cls = Optimizer("beam", "none", 0.0, -1, False, beamwidth=4)
+    cls.solve(coll)
+    assert sorted(cls.indices) == list(range(6))
+
+
+def test_optimizer_beam_infinite():
+    rng = np.random.default_rng(0)
+    coll = ArgTool().prep_inputs(list("abcd"))
+    for _ in range(8):
+        graph = rng.random((4, 4))
+        np.fill_diagonal(graph, np.nan)
+        graph[tuple(rng.choice(4, 2, replace=False))] = np.inf
+        coll.graph = Graph.from_matrix(graph)
+        cls = Optimizer("beam", "none", 0.0, -1, True)
+        cls.solve(coll)
+        assert sorted(cls.indices) == list(range(4))
+        assert np.nansum(cls.values) == np.inf
+    graph = np.full((4, 4), np.inf)
+    np.fill_diagonal(graph, np.nan)
+    coll.graph = Graph.from_matrix(graph)
+    cls = Optimizer("beam", "none", 0.0, -1, False)
+    cls.solve(coll)
+    assert sorted(cls.indices) == list(range(4))
+
+
 def test_optimizer_sampling_base():
     def check_side_effect(cls):
         assert cls.indices == [0, 1, 2]
         assert cls.values == [np.nan, -9, -5]
 
-    np.random.seed(0)
-    cls = Optimizer("sampling", "repeats", 0.0, -1, False)
+    cls = Optimizer("sampling", "repeats", 0.0, -1, False, seed=0)
     func = cls.solve
     coll = get_default_coll()
     fill_graph(coll)
@@ -131,10 +303,114 @@ def test_optimizer_sampling_cutoff():
         assert cls.indices == [0, 1, 2]
         assert cls.values == [np.nan, 1, 5]
 
-    np.random.seed(0)
-    cls = Optimizer("sampling", "repeats", -10.0, -1, False)
+    cls = Optimizer("sampling", "repeats", -10.0, -1, False, seed=0)
     func = cls.solve
     coll = get_default_coll()
     fill_graph(coll)
     func(coll)
     check_side_effect(cls)
+
+
+def test_optimizer_sampling_chains():
+    def check_side_effect(cls, chains):
+        assert len(cls.paths) == chains
+        costs = [np.nansum(values) for _, values in cls.paths]
+        assert np.nansum(cls.values) == min(costs)
+        for indices, _ in cls.paths:
+            assert sorted(indices) == list(range(6))
+
+    rng = np.random.default_rng(0)
+    graph = rng.random((6, 6))
+    np.fill_diagonal(graph, np.nan)
+    coll = ArgTool().prep_inputs(list("abcdef"))
+    coll.graph = Graph.from_matrix(graph)
+    runs = []
+    for _ in range(2):
+        cls = Optimizer("sampling", "none", 1.0, -1, False, seed=7, chains=16)
+        cls.solve(coll)
+        check_side_effect(cls, 16)
+        runs.append(cls.paths)
+    assert runs[0] == runs[1]
+    assert len({tuple(indices) for indices, _ in runs[0]}) > 1
+
+
+def test_optimizer_annealing():
+    def check_side_effect(cls, graph, greedy, maximize):
+        assert sorted(cls.indices) == sorted(greedy.indices)
+        cost = sum(graph[i, j] for i, j in zip(cls.indices, cls.indices[1:]))
+        assert np.isclose(np.nansum(cls.values), cost)
+        sign = -1 if maximize else 1
+        assert sign * cost <= sign * np.nansum(greedy.values) + 1e-9
+
+    kwargs = {"seed": 0, "chains": 4, "maxiter": 2000}
+    rng = np.random.default_rng(0)
+    graph = rng.random((8, 8))
+    np.fill_diagonal(graph, np.nan)
+    coll = ArgTool().prep_inputs(list("abcdefgh"))
+    coll.graph = Graph.from_matrix(graph)
+    for maximize, seqlen in itertools.product((False, True), (-1, 5)):
+        greedy = Optimizer("greedy", "none", 0.0, seqlen, maximize)
+        greedy.solve(coll)
+        cls = Optimizer("annealing", "none", 0.0, seqlen, maximize, **kwargs)
+        cls.solve(coll)
+        check_side_effect(cls, graph, greedy, maximize)
+    exact = Optimizer("heldkarp", "none", 0.0, -1, False)
+    exact.solve(coll)
+    cls = Optimizer("annealing", "none", 0.0, -1, False, **kwargs)
+    cls.solve(coll)
+    assert np.isclose(np.nansum(cls.values), np.nansum(exact.values))
+    for budget in ({"timebudget": 1e-9}, {"cooling": 1e-3}):
+        greedy = Optimizer("greedy", "none", 0.0, -1, False)
+        greedy.solve(coll)
+        cls = Optimizer("annealing", "none", 0.0, -1, False, seed=0, **budget)
+        cls.solve(coll)
+        check_side_effect(cls, graph, greedy, False)
+
+
+def test_optimizer_lists():
+    def check_side_effect(cls, nlists, length):
+        assert len(cls.indices) == len(set(cls.indices)) == nlists * length
+        assert cls.lists == [k for k in range(nlists) for _ in range(length)]
+        assert len(cls.paths) == nlists
+        for indices, values in cls.paths:
+            assert len(indices) == length
+            assert np.isnan(values[0])
+
+    rng = np.random.default_rng(0)
+    graph = rng.random((9, 9))
+    np.fill_diagonal(graph, np.nan)
+    coll = ArgTool().prep_inputs(list("abcdefghi"))
+    coll.graph = Graph.from_matrix(graph)
+    for optimizer in ("greedy", "sampling", "greedy+ls", "heldkarp", "beam"):
+        cls = Optimizer(optimizer, "none", 0.0, -1, False, seed=0, nlists=3)
+        cls.solve(coll)
+        check_side_effect(cls, 3, 3)
+        cls = Optimizer(optimizer, "none", 0.0, 2, True, seed=0, nlists=2)
+        cls.solve(coll)
+        check_side_effect(cls, 2, 2)
+    for nlists, seqlen in ((5, -1), (2, 5)):
+        cls = Optimizer("greedy", "none", 0.0, seqlen, False, nlists=nlists)
+        check_raises(cls.solve, coll, ValueError)
+
+
+def test_optimizer_heldkarp_infinite():
+    def check_side_effect(cls, graph):
+        assert sorted(cls.indices) == list(range(graph.shape[0]))
+        bounded = np.nan_to_num(graph, nan=np.nan, posinf=1e6)
+        totals = {
+            path: sum(bounded[i, j] for i, j in zip(path, path[1:]))
+            for path in itertools.permutations(range(graph.shape[0]))
+        }
+        assert np.isclose(totals[tuple(cls.indices)], max(totals.values()))
+
+    rng = np.random.default_rng(0)
+    for _ in range(8):
+        graph = rng.random((4, 4))
+        np.fill_diagonal(graph, np.nan)
+        i, j = rng.choice(4, 2, replace=False)
+        graph[i, j] = np.inf
+        coll = ArgTool().prep_inputs(["a b", "c d", "e f", "g h"])
+        coll.graph = Graph.from_matrix(graph)
+        cls = Optimizer("heldkarp", "repeats", 0.0, -1, True)
+        cls.solve(coll)
+        check_side_effect(cls, graph)
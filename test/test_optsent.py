@@ -2,10 +2,13 @@ import pathlib
 
 import numpy as np
 import numpy.testing as npt
+import pandas as pd
+import pytest
 
 from test_abstract import check_raises
 
 from optsent.abstract import IModel, IObjective, IOptimizer
+from optsent.models import Model
 from optsent.optsent import OptSent
 
 
@@ -20,8 +23,8 @@ def test_optsent_constructor():
         pass
 
     def check_output(cls, args):
-        base = "min_test_strings_objective=normlogp_optimizer=greedy_constraint=none_cutoff=0.0_model=gpt2"
-        if not all(isinstance(arg, str) for arg in args):
+        base = f"min_{cls.graph_id}_optimizer=greedy_constraint=none_cutoff=0.0"
+        if not all(isinstance(arg, str) for arg in args[1:]):
             assert "CUSTOM" in cls.unique_id
         else:
             assert cls.unique_id == base
@@ -37,6 +40,14 @@ def test_optsent_constructor():
     ):
         check_output(cls(arg[0], model=arg[1], objective=arg[2], optimizer=arg[3]), arg)
     check_raises(cls, (), TypeError)
+    unique_ids = {
+        cls(fname, **kwargs).unique_id
+        for kwargs in ({}, {"seed": 0}, {"seqlen": 2}, {"beamwidth": 4}, {"nlists": 2})
+    }
+    assert len(unique_ids) == 5
+    assert cls(fname, seed=0, chains=2).unique_id.endswith("_seed=0_chains=2")
+    for kwargs in ({"dtype": "float32"}, {"lazy": True}, {"topk": 2}):
+        assert cls(fname, **kwargs).unique_id not in unique_ids
 
 
 def test_optsent_runner():
@@ -92,3 +103,181 @@ def test_optsent_custom():
         optimizer=MockCustomOptimizer(),
     )
     check_output(optsent.run())
+
+
+def test_optsent_embsim(tmp_path):
+    def check_output(graph):
+        assert np.all(np.isnan(np.diag(graph)))
+        assert not np.any(np.isnan(graph[~np.eye(len(graph), dtype=bool)]))
+
+    fname = pathlib.Path(__file__).parent / "test_inputs" / "test_strings.txt"
+    optsent = OptSent(fname, outdir=tmp_path, objective="embsim")
+    optsent.run()
+    fname = tmp_path / "graphs" / optsent.graph_id / "GRAPH.csv"
+    graph = pd.read_csv(fname, index_col=0)
+    check_output(graph.values)
+
+
+def test_optsent_graph_reuse(tmp_path):
+    class MockCountingModel(IModel):
+        def __init__(self):
+            self.calls = 0
+
+        def score(self, sent):
+            self.calls += 1
+            return float(len(sent))
+
+    def check_output(optsent, model, builds):
+        optsent.run()
+        assert model.calls == builds * calls
+
+    model = MockCountingModel()
+    inputs = ["a", "ab", "abc"]
+    kwargs = {"outdir": tmp_path, "model": model, "objective": "normlogp"}
+    OptSent(inputs, **kwargs).run()
+    calls = model.calls
+    check_output(OptSent(inputs, optimizer="sampling", **kwargs), model, 1)
+    check_output(OptSent(inputs, maximize=True, **kwargs), model, 1)
+    check_output(OptSent(inputs, reuse_graph=False, **kwargs), model, 2)
+    check_output(OptSent(inputs[::-1], **kwargs), model, 3)
+    assert OptSent(inputs, **kwargs).graph_id != OptSent(inputs[::-1], **kwargs).graph_id
+    fname = tmp_path / "strings.csv"
+    fname.write_text("\n".join(["Sentence", *inputs]))
+    assert OptSent(fname, **kwargs).graph_id == OptSent(inputs, **kwargs).graph_id
+
+
+def test_optsent_graph_format(tmp_path):
+    class MockLengthModel(IModel):
+        @staticmethod
+        def score(sent):
+            return float(len(sent))
+
+    def check_output(optsent, graphfmt):
+        fname = tmp_path / "graphs" / optsent.graph_id / f"GRAPH.{graphfmt}"
+        assert fname.is_file()
+        return fname
+
+    inputs = ["a", "ab", "abc"]
+    kwargs = {"outdir": tmp_path, "model": MockLengthModel(), "maximize": True}
+    table = OptSent(inputs, graphfmt="npy", **kwargs).run()
+    fname = check_output(OptSent(inputs, **kwargs), "npy")
+    assert fname.with_suffix(".json").is_file()
+    assert not fname.with_suffix(".csv").is_file()
+    assert isinstance(np.load(fname, mmap_mode="r"), np.memmap)
+    pd.testing.assert_frame_equal(OptSent(inputs, **kwargs).run(), table)
+    OptSent(inputs, graphfmt="csv", reuse_graph=False, **kwargs).run()
+    check_output(OptSent(inputs, **kwargs), "csv")
+
+
+def test_optsent_graph_update(tmp_path):
+    class MockCountingModel(IModel):
+        def __init__(self):
+            self.calls = set()
+
+        def score(self, sent):
+            self.calls.add(sent)
+            return float(len(sent))
+
+    model = MockCountingModel()
+    kwargs = {"outdir": tmp_path, "model": model, "maximize": True}
+    base = OptSent(["a", "ab", "abc"], **kwargs)
+    base.run()
+    model.calls.clear()
+    basegraph = tmp_path / "graphs" / base.graph_id
+    OptSent(["abc", "a", "abcd"], basegraph=basegraph, **kwargs).run()
+    assert {"abcabcd", "aabcd", "abcdabc", "abcda"} <= model.calls
+    assert not {"abca", "aabc", "abab", "aab"} & model.calls
+    for arg in ({"objective": "embsim"}, {"topk": 2}, {"separator": " "}):
+        with pytest.raises(ValueError):
+            OptSent(["abc", "a"], basegraph=basegraph, **arg, **kwargs).run()
+
+
+def test_optsent_graph_repr(tmp_path):
+    class MockLengthModel(IModel):
+        @staticmethod
+        def score(sent):
+            return float(len(sent))
+
+    def check_output(optsent, fname):
+        assert (tmp_path / "graphs" / optsent.graph_id / fname).is_file()
+
+    inputs = ["a", "ab", "abc", "abcd"]
+    kwargs = {"outdir": tmp_path, "model": MockLengthModel(), "maximize": True}
+    dense = OptSent(inputs, **kwargs).run()
+    pd.testing.assert_frame_equal(
+        OptSent(inputs, dtype="float32", **kwargs).run(), dense
+    )
+    sparse = OptSent(inputs, topk=3, **kwargs)
+    assert sparse.graph_id != OptSent(inputs, **kwargs).graph_id
+    pd.testing.assert_frame_equal(sparse.run(), dense)
+    check_output(sparse, "GRAPH.npz")
+    pd.testing.assert_frame_equal(OptSent(inputs, topk=3, **kwargs).run(), dense)
+    table = OptSent(inputs, topk=1, **kwargs).run()
+    assert sorted(table.Sentence) == sorted(inputs)
+
+
+def test_optsent_lists(tmp_path):
+    class MockLengthModel(IModel):
+        @staticmethod
+        def score(sent):
+            return float(len(sent))
+
+    inputs = ["a", "ab", "abc", "abcd", "abcde", "abcdef", "abcdefg"]
+    kwargs = {"outdir": tmp_path, "model": MockLengthModel(), "maximize": True}
+    table = OptSent(inputs, nlists=3, **kwargs).run()
+    assert table.ListID.tolist() == [0, 0, 1, 1, 2, 2]
+    assert table.Sentence.is_unique
+    assert "ListID" not in OptSent(inputs, **kwargs).run().columns
+
+
+def test_optsent_lazy(tmp_path):
+    class MockCountingModel(IModel):
+        def __init__(self):
+            self.calls = 0
+
+        def score(self, sent):
+            self.calls += 1
+            return float(len(sent))
+
+    inputs = ["a", "ab", "abc", "abcd", "abcde"]
+    model = MockCountingModel()
+    kwargs = {"outdir": tmp_path, "model": model, "maximize": True}
+    dense = OptSent(inputs, export=False, **kwargs).run()
+    calls, model.calls = model.calls, 0
+    optsent = OptSent(inputs, lazy=True, **kwargs)
+    pd.testing.assert_frame_equal(optsent.run(), dense)
+    assert model.calls <= calls
+    assert not (tmp_path / "graphs" / optsent.graph_id).exists()
+    with pytest.raises(ValueError):
+        OptSent(inputs, lazy=True, topk=2, **kwargs)
+
+
+def test_optsent_precision(monkeypatch, tmp_path):
+    inputs = ["a", "ab", "abc"]
+    base = OptSent(inputs, outdir=tmp_path).graph_id
+    assert OptSent(inputs, outdir=tmp_path, precision="int8").graph_id != base
+    monkeypatch.setattr(Model, "_bf16_supported", staticmethod(lambda: False))
+    assert OptSent(inputs, outdir=tmp_path, precision="bf16").graph_id == base
+
+
+def test_optsent_prune(tmp_path):
+    class MockEmbedModel(IModel):
+        @staticmethod
+        def score(sent):
+            return float(len(sent))
+
+        @staticmethod
+        def embed(sent):
+            return np.array([[1.0, len(sent) / 10]], dtype=np.float32)
+
+    inputs = ["a", "ab", "abc", "abcd", "abcde"]
+    kwargs = {"outdir": tmp_path, "model": MockEmbedModel(), "maximize": True}
+    dense = OptSent(inputs, **kwargs).run()
+    pruned = OptSent(inputs, prune=4, **kwargs)
+    assert pruned.graph_id != OptSent(inputs, **kwargs).graph_id
+    pd.testing.assert_frame_equal(pruned.run(), dense)
+    assert (tmp_path / "graphs" / pruned.graph_id / "GRAPH.npz").is_file()
+    table = OptSent(inputs, prune=2, **kwargs).run()
+    assert sorted(table.Sentence) == sorted(inputs)
+    with pytest.raises(ValueError):
+        OptSent(inputs, lazy=True, prune=2, **kwargs)